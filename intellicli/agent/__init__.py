@@ -1,10 +1,25 @@
 """
 智能代理包
 提供任务规划、执行和模型路由功能
+
+各组件按需在首次访问时导入，只用到其中一个子模块时不会连带加载其余模块。
 """
 
-from .planner import Planner
-from .executor import Executor
-from .model_router import ModelRouter
+import importlib
+
+# 导出名称 -> 所在子模块
+_LAZY_EXPORTS = {
+    "Planner": ".planner",
+    "Executor": ".executor",
+    "ModelRouter": ".model_router",
+}
 
 __all__ = ["Planner", "Executor", "ModelRouter"]
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
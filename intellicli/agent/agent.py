@@ -2,13 +2,20 @@
 智能代理类 - 整合规划、执行和复盘功能
 """
 
-import yaml
+from itertools import islice
+from types import MappingProxyType
 from typing import List, Dict, Any, Optional
-from .planner import Planner
+from .planner import Planner, hedge_delay_from_config
+from .plan_cache import PlanCache
 from .executor import Executor
 from .task_reviewer import TaskReviewer
+from ..config.model_config import ReviewConfig
 from ..ui.display import ui
 
+# 复盘结果缺少某一部分时使用的共享只读默认值
+_EMPTY_SECTION = MappingProxyType({})
+_EMPTY_ITEMS = ()
+
 class Agent:
     """智能代理，整合任务规划、执行和复盘功能"""
     
@@ -24,17 +31,20 @@ class Agent:
         self.config = config or {}
         
         # 初始化核心组件
-        self.planner = Planner(model_client)
         self.executor = Executor(model_client)
-        self.task_reviewer = TaskReviewer(model_client)
+        self.planner = Planner(
+            model_client,
+            plan_cache=PlanCache.from_config(self.config),
+            speculator=self.executor.speculate,
+            hedge_delay=hedge_delay_from_config(self.config)
+        )
         
         # 获取复盘配置
-        self.review_config = self.config.get('task_review', {
-            'enabled': False,
-            'auto_review': False,
-            'review_threshold': 0.8,
-            'max_iterations': 3
-        })
+        self.review_config = ReviewConfig.from_config(self.config)
+        self.task_reviewer = TaskReviewer(
+            model_client,
+            response_cache_path=self.review_config.response_cache_path
+        )
         
         # 执行历史记录
         self.execution_history = []
@@ -54,7 +64,7 @@ class Agent:
         ui.print_info(f"任务目标: {goal}")
         
         # 确定是否启用复盘
-        should_review = enable_review if enable_review is not None else self.review_config.get('enabled', False)
+        should_review = enable_review if enable_review is not None else self.review_config.enabled
         
         # 执行主要任务
         result = self._execute_main_task(goal)
@@ -96,6 +106,10 @@ class Agent:
         # 3. 分析执行结果
         execution_status = self._analyze_execution_results(results)
         
+        # 全部步骤成功的计划可作为相似目标的规划模板
+        if execution_status['status'] == 'completed':
+            self.planner.record_successful_plan(goal, plan)
+        
         return {
             'status': execution_status['status'],
             'success_rate': execution_status['success_rate'],
@@ -139,12 +153,12 @@ class Agent:
         ui.print_section_header("任务复盘", "🔍")
         
         success_rate = execution_result.get('success_rate', 0)
-        review_threshold = self.review_config.get('review_threshold', 0.8)
-        max_iterations = self.review_config.get('max_iterations', 3)
+        review_threshold = self.review_config.review_threshold
+        max_iterations = self.review_config.max_iterations
         
         # 判断是否需要复盘
         needs_review = success_rate < review_threshold
-        auto_review = self.review_config.get('auto_review', False)
+        auto_review = self.review_config.auto_review
         
         if not needs_review and not auto_review:
             ui.print_success("任务执行成功，无需复盘")
@@ -176,29 +190,29 @@ class Agent:
     
     def _display_review_results(self, review_result: Dict[str, Any]):
         """显示复盘结果"""
-        overall_assessment = review_result.get('overall_assessment', {})
-        
-        ui.print_info(f"📊 整体评分: {overall_assessment.get('overall_score', 0)}/100")
-        ui.print_info(f"🏆 评级: {overall_assessment.get('grade', '未知')}")
-        ui.print_info(f"📝 总结: {overall_assessment.get('summary', '无')}")
-        
+        overall_assessment = review_result.get('overall_assessment', _EMPTY_SECTION)
         # 显示目标达成情况
-        goal_achievement = review_result.get('goal_achievement', {})
-        ui.print_info(f"🎯 目标达成度: {goal_achievement.get('achievement_percentage', 0)}%")
+        goal_achievement = review_result.get('goal_achievement', _EMPTY_SECTION)
+        
+        ui.print_info_lines((
+            f"📊 整体评分: {overall_assessment.get('overall_score', 0)}/100",
+            f"🏆 评级: {overall_assessment.get('grade', '未知')}",
+            f"📝 总结: {overall_assessment.get('summary', '无')}",
+            f"🎯 目标达成度: {goal_achievement.get('achievement_percentage', 0)}%",
+        ))
         
         # 显示问题列表
-        issues = review_result.get('issues_identified', [])
+        issues = review_result.get('issues_identified', _EMPTY_ITEMS)
         if issues:
             ui.print_warning(f"⚠️ 发现 {len(issues)} 个问题:")
-            for issue in issues[:3]:  # 只显示前3个问题
-                ui.print_info(f"   - {issue.get('description', '未知问题')}")
+            # 只显示前3个问题
+            ui.print_info_lines([f"   - {issue.get('description', '未知问题')}" for issue in islice(issues, 3)])
         
         # 显示改进建议
-        suggestions = review_result.get('improvement_suggestions', [])
+        suggestions = review_result.get('improvement_suggestions', _EMPTY_ITEMS)
         if suggestions:
-            ui.print_info(f"💡 改进建议:")
-            for suggestion in suggestions[:3]:  # 只显示前3个建议
-                ui.print_info(f"   - {suggestion.get('suggestion', '无建议')}")
+            # 只显示前3个建议
+            ui.print_info_lines(["💡 改进建议:", *(f"   - {suggestion.get('suggestion', '无建议')}" for suggestion in islice(suggestions, 3))])
     
     def _execute_supplementary_plan(
         self, 
@@ -233,7 +247,7 @@ class Agent:
             })
             
             # 检查是否达到满意的结果
-            if supplement_analysis['success_rate'] >= self.review_config.get('review_threshold', 0.8):
+            if supplement_analysis['success_rate'] >= self.review_config.review_threshold:
                 ui.print_success(f"第 {iteration} 次改进成功！")
                 break
             
@@ -301,7 +315,7 @@ class Agent:
             
             execute_supplement = ui.get_user_input("\n是否执行补充计划？(y/N)").lower()
             if execute_supplement in ['y', 'yes', '是']:
-                max_iterations = self.review_config.get('max_iterations', 3)
+                max_iterations = self.review_config.max_iterations
                 updated_result = self._execute_supplementary_plan(
                     goal, execution_result, supplementary_plan, max_iterations
                 )
@@ -324,4 +338,8 @@ class Agent:
     def clear_history(self):
         """清空执行历史"""
         self.execution_history = []
-        ui.print_success("执行历史已清空") 
\ No newline at end of file
+        ui.print_success("执行历史已清空")
+    
+    def close(self):
+        """释放执行器持有的资源（预执行线程池）"""
+        self.executor.close()
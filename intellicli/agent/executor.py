@@ -1,10 +1,42 @@
 import json
 import inspect
-from typing import List, Dict, Any, Optional
+import re
+from typing import List, Dict, Any, Optional, Tuple, Union
 import importlib
 import yaml
 import os
 import time # Added for time.time()
+from itertools import chain, islice
+from concurrent.futures import ThreadPoolExecutor
+from ..config.model_config import SafeLoader
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 无副作用、可在规划期间提前执行的本地只读工具。
+# 不包括 web_search：它会在用户确认执行计划之前向外部搜索服务发送请求
+SPECULATIVE_TOOLS = frozenset({'list_directory', 'read_file'})
+
+# 工具以文本形式返回错误信息时包含的关键字，一次扫描即可判断
+_ERROR_OUTPUT_RE = re.compile('出错|错误|Error')
+
+def canonical_json(obj: Any) -> Union[bytes, str]:
+    """
+    按键排序序列化对象，用于判断两组参数是否相同。
+    结果只用于相互比较和作为字典键；可用时使用 orjson，否则回退到标准库 json。
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS, default=str)
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, default=str)
+
+def is_error_output(output: Any) -> bool:
+    """判断工具输出是否为文本形式的错误信息"""
+    return isinstance(output, str) and _ERROR_OUTPUT_RE.search(output) is not None
 
 class Executor:
     """
@@ -36,7 +68,11 @@ class Executor:
         self.config_path = config_path
         self.tools = {}  # 内置工具
         self.tool_info = {}  # 存储工具的详细信息
+        self._tool_param_names = {}  # 工具名 -> 参数名集合，用于校验步骤参数
         self.mcp_manager = None  # MCP 工具管理器
+        self._speculation_pool = None  # 预执行线程池（按需创建）
+        self._speculative_results = {}  # (步骤位置, 工具, 参数) -> Future
+        self._speculation_next_index = 0  # 下一个可复用的步骤位置
         
         # 加载内置工具
         self._load_tools(tool_modules)
@@ -100,6 +136,7 @@ class Executor:
                                 "description": attr.__doc__ or "无描述",
                                 "parameters": parameters
                             }
+                            self._tool_param_names[attr_name] = frozenset(p["name"] for p in parameters)
                         except Exception as e:
                             # 静默处理内置类型的签名提取失败，避免警告噪音
                             # 如果无法提取签名，至少保存基本信息
@@ -108,9 +145,21 @@ class Executor:
                                 "description": attr.__doc__ or "无描述",
                                 "parameters": []
                             }
+                            self._tool_param_names[attr_name] = frozenset()
             except ImportError as e:
                 print(f"警告: 无法导入模块 {module_name}。{e}")
 
+    def find_invalid_params(self, tool_name: str, arguments: Dict[str, Any]) -> List[str]:
+        """返回内置工具不接受的参数名，未知工具或参数全部有效时返回空列表"""
+        param_names = self._tool_param_names.get(tool_name)
+        if param_names is None:
+            return []
+        return [name for name in arguments if name not in param_names]
+
+    def expected_param_names(self, tool_name: str) -> List[str]:
+        """按声明顺序返回内置工具的参数名，用于错误提示"""
+        return [p["name"] for p in self.tool_info[tool_name]["parameters"]]
+
     def _setup_content_integrator(self, model_client):
         """设置内容整合工具的模型客户端"""
         try:
@@ -129,7 +178,7 @@ class Executor:
             
             # 读取配置
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=SafeLoader)
             
             # 检查是否有 MCP 配置
             mcp_config = config.get('mcp_servers', {})
@@ -229,6 +278,87 @@ class Executor:
         
         return all_tools
 
+    def _speculation_key(self, index: int, tool_name: str, arguments: Dict[str, Any]) -> tuple:
+        """预执行结果的键：步骤位置、工具名和规范化的参数"""
+        return (index, tool_name, canonical_json(arguments))
+
+    def speculate(self, predicted_plan: List[Dict[str, Any]]) -> None:
+        """
+        在后台按顺序提前执行预测计划开头的只读步骤。
+        
+        遇到第一个非只读工具或依赖上一步输出的步骤即停止，保证预执行不产生副作用。
+        """
+        self.discard_speculation()
+        
+        prefix = []
+        for task in predicted_plan:
+            tool_name = task.get("tool")
+            arguments = task.get("arguments", {})
+            if (tool_name not in SPECULATIVE_TOOLS or tool_name not in self.tools
+                    or not isinstance(arguments, dict)
+                    or "<PREVIOUS_STEP_OUTPUT>" in json.dumps(arguments, ensure_ascii=False, default=str)):
+                break
+            prefix.append((tool_name, arguments))
+        
+        if not prefix:
+            return
+        
+        if self._speculation_pool is None:
+            # 单线程保证预执行步骤按计划顺序运行
+            self._speculation_pool = ThreadPoolExecutor(max_workers=1)
+        
+        for index, (tool_name, arguments) in enumerate(prefix):
+            key = self._speculation_key(index, tool_name, arguments)
+            self._speculative_results[key] = self._speculation_pool.submit(self.tools[tool_name], **arguments)
+
+    def take_speculative_result(self, index: int, tool_name: str, arguments: Dict[str, Any]) -> Tuple[bool, Any]:
+        """
+        取出与实际计划第 `index` 步完全一致的预执行结果，返回 `(是否命中, 工具输出)`。
+        
+        实际计划与预测前缀出现第一处不一致时丢弃全部预执行结果，返回 `(False, None)`
+        表示需要正常执行；命中时工具输出本身可能为 None。
+        """
+        if not self._speculative_results:
+            return False, None
+        
+        # 只复用从第一步开始连续一致的前缀
+        future = None
+        if index == self._speculation_next_index:
+            future = self._speculative_results.pop(self._speculation_key(index, tool_name, arguments), None)
+        if future is None:
+            self.discard_speculation()
+            return False, None
+        self._speculation_next_index += 1
+        
+        try:
+            return True, future.result()
+        except Exception:
+            # 预执行失败时回退到正常执行，由正常路径报告错误
+            return False, None
+
+    def discard_speculation(self) -> None:
+        """丢弃所有未使用的预执行结果"""
+        for future in self._speculative_results.values():
+            future.cancel()
+        self._speculative_results = {}
+        self._speculation_next_index = 0
+
+    def invalidate_speculation(self, tool_name: str) -> None:
+        """
+        即将执行的工具不是只读工具时丢弃全部预执行结果。
+        
+        该工具可能修改文件，之后再读取的内容与规划期间预执行的结果不再一致。
+        """
+        if self._speculative_results and tool_name not in SPECULATIVE_TOOLS:
+            self.discard_speculation()
+
+    def close(self) -> None:
+        """丢弃预执行结果并关闭预执行线程池，不等待正在运行的只读步骤"""
+        self.discard_speculation()
+        if self._speculation_pool is not None:
+            self._speculation_pool.shutdown(wait=False)
+            self._speculation_pool = None
+
     def _process_argument(self, arg_value: Any, last_output: str) -> Any:
         """
         递归处理参数值，替换占位符。
@@ -296,6 +426,7 @@ class Executor:
             # 使用增强的步骤执行显示
             ui.print_step_execution_enhanced(step_num, total_steps, tool_name, 
                                            model=getattr(self, 'model_name', None))
+            self.invalidate_speculation(tool_name)
             
             # 替换占位符
             try:
@@ -354,12 +485,10 @@ class Executor:
                     
                     # 验证参数名称
                     if tool_name in self.tool_info:
-                        expected_params = [p["name"] for p in self.tool_info[tool_name]["parameters"]]
-                        provided_params = list(processed_arguments.keys())
-                        
                         # 检查是否有无效的参数
-                        invalid_params = [p for p in provided_params if p not in expected_params]
+                        invalid_params = self.find_invalid_params(tool_name, processed_arguments)
                         if invalid_params:
+                            expected_params = self.expected_param_names(tool_name)
                             error_message = f"工具 {tool_name} 收到无效参数: {invalid_params}。期望参数: {expected_params}"
                             step_result['error'] = error_message
                             detailed_results.append(step_result)
@@ -375,11 +504,13 @@ class Executor:
                         if any(keyword in command.lower() for keyword in ['install', 'build', 'compile', 'download']):
                             ui.print_long_running_task_warning(f"Shell命令: {command[:50]}...")
                     
-                    # 调用工具函数
-                    output = tool_function(**processed_arguments)
+                    # 调用工具函数（规划期间已预执行的只读步骤直接复用结果）
+                    hit, output = self.take_speculative_result(i, tool_name, processed_arguments)
+                    if not hit:
+                        output = tool_function(**processed_arguments)
                     
                     # 检查输出是否为错误信息
-                    if isinstance(output, str) and ("出错" in output or "错误" in output or "Error" in output):
+                    if is_error_output(output):
                         error_message = output
                         step_result['error'] = error_message
                         detailed_results.append(step_result)
@@ -444,13 +575,10 @@ class Executor:
             
             else:
                 # 工具不存在
-                available_builtin_tools = list(self.tools.keys())
-                available_mcp_tools = []
-                if self.mcp_manager:
-                    available_mcp_tools = list(self.mcp_manager.all_tools.keys())
-                
-                all_available_tools = available_builtin_tools + available_mcp_tools
-                error_message = f"未找到工具 '{tool_name}'。可用工具: {all_available_tools[:10]}{'...' if len(all_available_tools) > 10 else ''}"
+                # 只取提示需要的前 11 个工具名（第 11 个用于判断是否显示省略号）
+                available_tools = chain(self.tools, self.mcp_manager.all_tools if self.mcp_manager else ())
+                shown_tools = list(islice(available_tools, 11))
+                error_message = f"未找到工具 '{tool_name}'。可用工具: {shown_tools[:10]}{'...' if len(shown_tools) > 10 else ''}"
                 step_result['error'] = error_message
                 
                 # 使用增强的完成显示
@@ -459,6 +587,9 @@ class Executor:
             
             detailed_results.append(step_result)
 
+        # 未被采用的预执行结果不再有效
+        self.discard_speculation()
+        
         # 计算总执行时间
         total_execution_time = time.time() - total_start_time
         
@@ -496,7 +627,9 @@ class Executor:
             print("MCP 管理器未初始化")
     
     def __del__(self):
-        """析构函数，确保 MCP 连接正确关闭"""
+        """析构函数，确保预执行线程池和 MCP 连接正确关闭"""
+        if getattr(self, '_speculation_pool', None) is not None:
+            self.close()
         if hasattr(self, 'mcp_manager') and self.mcp_manager:
             try:
                 self.mcp_manager.stop_health_check()
@@ -9,6 +9,9 @@ from ..models.base_llm import BaseLLM
 from ..models.multimodal_manager import multimodal_manager
 from datetime import datetime
 
+# 图像文件扩展名匹配（一次编译，所有路径复用）
+_IMAGE_EXT_RE = re.compile(r'\.(?:png|jpe?g|gif|bmp|tiff)$', re.IGNORECASE)
+
 class ModelRouter:
     """智能模型路由器，根据任务特征选择最合适的模型"""
     
@@ -22,10 +25,23 @@ class ModelRouter:
         """
         self.model_clients = model_clients
         self.config = config
+        self._capabilities_by_alias = self._build_capabilities_table()
         self.routing_rules = self._build_routing_rules()
+        # 规则在初始化后不再变化，按优先级排序一次即可
+        self._rules_sorted = sorted(self.routing_rules, key=lambda x: x.get("priority", 0), reverse=True)
+        
+        # 路由规则和模型能力在初始化后不再变化，预先编译模式并选定每条规则的模型
+        self._compiled_rules = self._compile_rules()
+        self._fallback_model = self._select_default_model()
+        # 图像文件路径固定路由到视觉模型
+        self._vision_model = self._select_model_by_capability(["vision"])
         
-        # 注册模型到多模态管理器
-        self._register_models_to_multimodal_manager()
+        # 多模态管理器注册推迟到首次处理多模态任务时
+        self._mm_registered = False
+        
+        # 主模型客户端在首次查询时解析一次
+        self._primary_client = None
+        self._primary_resolved = False
     
     def _build_routing_rules(self) -> List[Dict[str, Any]]:
         """动态构建路由规则，基于实际可用的模型"""
@@ -142,33 +158,49 @@ class ModelRouter:
         
         # 检查是否涉及文件操作且包含图像文件
         if "file_paths" in task_context:
-            image_extensions = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff']
-            for path in task_context["file_paths"]:
-                if any(path.lower().endswith(ext) for ext in image_extensions):
-                    return self._select_model_by_capability(["vision"])
+            if any(_IMAGE_EXT_RE.search(path) for path in task_context["file_paths"]):
+                return self._vision_model
         
         # 根据任务描述匹配路由规则，按优先级排序
-        sorted_rules = sorted(self.routing_rules, key=lambda x: x.get("priority", 0), reverse=True)
-        
-        for rule in sorted_rules:
-            for pattern in rule["patterns"]:
-                if re.search(pattern, task_description, re.IGNORECASE):
-                    # 找到匹配的规则，根据所需能力选择最合适的模型
-                    required_capabilities = rule["required_capabilities"]
-                    selected_model = self._select_model_by_capability(required_capabilities)
-                    
-                    # 记录路由信息用于调试
-                    self._log_routing_decision(task_description, rule, selected_model)
-                    
-                    return selected_model
+        matched = self._match_rule(task_description)
+        if matched is not None:
+            rule, selected_model = matched
+            # 记录路由信息用于调试
+            self._log_routing_decision(task_description, rule, selected_model)
+            return selected_model
         
         # 如果没有匹配的规则，返回默认的主模型
+        return self._fallback_model
+    
+    def _compile_rules(self) -> List[tuple]:
+        """
+        按优先级预编译路由规则，返回 (规则, 编译后的模式列表, 选定的模型别名) 列表。
+        
+        每个模式单独编译并保持原有的 IGNORECASE 匹配语义；规则选中的模型只取决于
+        初始化后固定的模型能力，因此预先计算。
+        """
+        return [
+            (
+                rule,
+                [re.compile(pattern, re.IGNORECASE) for pattern in rule["patterns"]],
+                self._select_model_by_capability(rule["required_capabilities"])
+            )
+            for rule in self._rules_sorted
+        ]
+    
+    def _match_rule(self, task_description: str) -> Optional[tuple]:
+        """返回第一条匹配任务描述的 (规则, 模型别名)，没有匹配时返回 None"""
+        for rule, patterns, selected_model in self._compiled_rules:
+            if any(pattern.search(task_description) for pattern in patterns):
+                return rule, selected_model
+        return None
+    
+    def _select_default_model(self) -> Optional[str]:
+        """没有规则匹配时使用的模型：主模型，最后退回第一个可用模型"""
         primary_model = self.config.get("models", {}).get("primary")
         if primary_model and primary_model in self.model_clients:
             return primary_model
-        
-        # 最后的后备选择
-        return list(self.model_clients.keys())[0] if self.model_clients else None
+        return next(iter(self.model_clients), None)
     
     def _select_model_by_capability(self, required_capabilities: List[str]) -> str:
         """根据所需能力选择最合适的模型"""
@@ -207,7 +239,7 @@ class ModelRouter:
         if primary_model and primary_model in self.model_clients:
             return primary_model
         
-        return list(self.model_clients.keys())[0] if self.model_clients else None
+        return next(iter(self.model_clients), None)
     
     def _calculate_model_priority(self, model_alias: str, required_capabilities: List[str]) -> int:
         """计算模型对于特定能力需求的优先级"""
@@ -282,16 +314,8 @@ class ModelRouter:
         selected_model = self.route_task(task_description, task_context)
         
         # 找到匹配的规则
-        matched_rule = None
-        sorted_rules = sorted(self.routing_rules, key=lambda x: x.get("priority", 0), reverse=True)
-        
-        for rule in sorted_rules:
-            for pattern in rule["patterns"]:
-                if re.search(pattern, task_description, re.IGNORECASE):
-                    matched_rule = rule
-                    break
-            if matched_rule:
-                break
+        matched = self._match_rule(task_description)
+        matched_rule = matched[0] if matched else None
         
         # 获取模型信息
         selected_model_info = None
@@ -320,19 +344,25 @@ class ModelRouter:
         """获取指定模型的客户端"""
         return self.model_clients.get(model_alias)
     
+    def get_primary_model_client(self) -> Optional[BaseLLM]:
+        """获取主模型客户端；未配置主模型时返回第一个可用模型，结果在首次解析后复用"""
+        if not self._primary_resolved:
+            primary_model = self.config.get('models', {}).get('primary')
+            if primary_model:
+                self._primary_client = self.get_model_client(primary_model)
+            else:
+                first_model = next(iter(self.model_clients), None)
+                self._primary_client = self.get_model_client(first_model) if first_model else None
+            self._primary_resolved = True
+        return self._primary_client
+    
     def get_routing_info(self, task_description: str) -> Dict[str, Any]:
         """获取任务路由信息，用于调试和日志"""
         selected_model = self.route_task(task_description)
         
         # 找到匹配的规则
-        matched_rule = None
-        for rule in self.routing_rules:
-            for pattern in rule["patterns"]:
-                if re.search(pattern, task_description, re.IGNORECASE):
-                    matched_rule = rule
-                    break
-            if matched_rule:
-                break
+        matched = self._match_rule(task_description)
+        matched_rule = matched[0] if matched else None
         
         return {
             "task_description": task_description,
@@ -353,19 +383,21 @@ class ModelRouter:
             }
         return models_info
     
-    def _get_model_capabilities(self, model_alias: str) -> List[str]:
-        """获取模型的能力列表"""
-        # 从配置文件获取能力
+    def _build_capabilities_table(self) -> Dict[str, List[str]]:
+        """从配置中预先构建模型别名到能力列表的映射"""
+        capabilities_by_alias = {}
         if "models" in self.config and "providers" in self.config["models"]:
             for provider in self.config["models"]["providers"]:
-                if provider.get("alias") == model_alias:
-                    capabilities = provider.get("capabilities", [])
-                    if capabilities:
-                        return capabilities
-        
+                capabilities = provider.get("capabilities", [])
+                if capabilities:
+                    capabilities_by_alias.setdefault(provider.get("alias"), capabilities)
+        return capabilities_by_alias
+    
+    def _get_model_capabilities(self, model_alias: str) -> List[str]:
+        """获取模型的能力列表"""
         # 如果配置中没有指定能力，返回基础通用能力
         # 这种情况下应该提醒用户完善配置
-        return ["general"]
+        return self._capabilities_by_alias.get(model_alias, ["general"])
     
     def _register_models_to_multimodal_manager(self):
         """将模型注册到多模态管理器"""
@@ -377,12 +409,20 @@ class ModelRouter:
             else:
                 multimodal_manager.register_text_model(alias, client)
     
+    def _ensure_mm_registered(self):
+        """确保模型已注册到多模态管理器（仅在首次使用时注册）"""
+        if not self._mm_registered:
+            self._register_models_to_multimodal_manager()
+            self._mm_registered = True
+    
     def process_multimodal_task(self, task_description: str, context: Dict[str, Any] = None) -> str:
         """处理多模态任务"""
+        self._ensure_mm_registered()
         return multimodal_manager.process_multimodal_input(task_description, context)
     
     def analyze_task_modality(self, task_description: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """分析任务的模态类型"""
+        self._ensure_mm_registered()
         return multimodal_manager.analyze_input(task_description, context)
     
     def validate_routing_rules(self) -> Dict[str, Any]:
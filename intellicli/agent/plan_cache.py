@@ -0,0 +1,319 @@
+"""
+规划缓存
+保存成功执行过的只读计划模板，相似目标再次出现时直接复用，跳过模型规划
+"""
+
+import json
+import logging
+import math
+import os
+import re
+import sqlite3
+import zlib
+from contextlib import closing
+from array import array
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# 目标中的具体值（文件路径、文件名、数字），缓存时替换为占位符
+_ENTITY_RE = re.compile(
+    r'(?:[A-Za-z]:)?(?:[\w.~-]*[/\\])+[\w.-]+'  # 路径
+    r'|[\w-]+\.[A-Za-z0-9]{1,8}\b'             # 带扩展名的文件名
+    r'|(?<![\w.])\d+(?:\.\d+)?(?![\w.])',      # 数字
+    re.ASCII
+)
+_PLACEHOLDER_RE = re.compile(r'\{\{ENTITY_(\d+)\}\}')
+_CWD_PLACEHOLDER = '{{CWD}}'
+
+# 关键词提取：英文单词 + 中文二元组
+_WORD_RE = re.compile(r'[a-z][a-z0-9_]+')
+_CJK_RUN_RE = re.compile(r'[\u4e00-\u9fff]+')
+
+_STOPWORDS = frozenset({
+    'the', 'an', 'to', 'of', 'and', 'in', 'on', 'for', 'with', 'me', 'my',
+    'please', 'it', 'this', 'that', 'is', 'are', 'be', 'into', 'from',
+    '一个', '帮我', '请帮', '我们', '你们', '这个', '那个', '然后', '并且', '一下',
+})
+
+# 嵌入向量维度（特征哈希）
+_EMBEDDING_DIM = 256
+
+# 可直接复用的计划只能包含这些只读工具。相似度只比较关键词，"删除 a.txt"
+# 可能命中"删除 b 目录"的模板，含写入、删除或 Shell 命令的计划必须交给模型重新规划
+REPLAYABLE_TOOLS = frozenset({
+    'read_file', 'list_directory', 'show_current_directory', 'check_file_exists',
+    'find_images', 'get_image_info', 'find_all_documents', 'search_in_documents',
+    'search_code_patterns', 'get_repository_info', 'get_commit_history',
+    'get_file_changes', 'compare_branches', 'get_contributors_stats', 'search_commits',
+})
+
+
+def is_replayable(plan: List[Dict[str, Any]]) -> bool:
+    """计划中的所有步骤都是只读工具时才允许不经模型直接复用"""
+    return bool(plan) and all(
+        isinstance(step, dict) and step.get('tool') in REPLAYABLE_TOOLS for step in plan
+    )
+
+
+class PlanCache:
+    """基于 SQLite 的规划模板缓存"""
+
+    def __init__(self, db_path: str = None, similarity_threshold: float = 0.9):
+        """
+        初始化规划缓存
+
+        Args:
+            db_path: SQLite 数据库路径，默认为用户目录下的缓存文件
+            similarity_threshold: 命中缓存所需的最小余弦相似度
+        """
+        self.db_path = os.path.expanduser(db_path) if db_path else str(Path.home() / '.intellicli_plan_cache.sqlite')
+        self.similarity_threshold = similarity_threshold
+        self._rows = None  # 内存中的 (模板 JSON, float32 向量)，首次查找时加载
+        self._init_db()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> Optional['PlanCache']:
+        """根据配置创建规划缓存，未启用时返回 None"""
+        cache_config = (config or {}).get('plan_cache', {})
+        if not cache_config.get('enabled', False):
+            return None
+        return cls(
+            db_path=cache_config.get('db_path'),
+            similarity_threshold=cache_config.get('similarity_threshold', 0.9)
+        )
+
+    def _init_db(self):
+        """创建缓存表"""
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS plan_cache "
+                    "(keyword TEXT, template_json TEXT, embedding BLOB, scale REAL)"
+                )
+                # scale 列仅由曾经的 int8 量化格式使用，新写入的 float32 向量该列为空
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(plan_cache)")}
+                if 'scale' not in columns:
+                    conn.execute("ALTER TABLE plan_cache ADD COLUMN scale REAL")
+                # 转移表：上一个目标的关键词 -> 紧随其后的目标所用的计划模板
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS plan_transition "
+                    "(prev_keyword TEXT PRIMARY KEY, next_template_json TEXT)"
+                )
+        except sqlite3.Error as e:
+            logger.warning("无法初始化规划缓存 %s: %s", self.db_path, e)
+
+    def lookup(self, goal: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        查找与目标相似的缓存计划
+
+        Args:
+            goal: 任务目标
+
+        Returns:
+            替换占位符后的计划，未命中时返回 None
+        """
+        entities = self._extract_entities(goal)
+        embedding = self._embed(self.extract_keyword(goal))
+        if embedding is None:
+            return None
+
+        rows = self._load_rows()
+        if not rows:
+            return None
+
+        # 查询向量是稀疏的特征哈希向量，只需计算非零分量的点积
+        query = [(i, v) for i, v in enumerate(embedding) if v]
+        best_template, best_score = None, self.similarity_threshold
+        for template_json, stored in rows:
+            score = sum(stored[i] * v for i, v in query)
+            if score >= best_score:
+                best_template, best_score = template_json, score
+
+        if best_template is None:
+            return None
+
+        return self._fill_template(json.loads(best_template), entities)
+
+    def store(self, goal: str, plan: List[Dict[str, Any]]):
+        """
+        将成功执行的计划泛化为模板并写入缓存（仅限只读计划，见 REPLAYABLE_TOOLS）
+
+        Args:
+            goal: 任务目标
+            plan: 成功执行的计划
+        """
+        keyword = self.extract_keyword(goal)
+        embedding = self._embed(keyword)
+        if embedding is None or not is_replayable(plan):
+            return
+
+        template = self._generalize(plan, self._extract_entities(goal))
+        template_json = json.dumps(template, ensure_ascii=False, sort_keys=True)
+
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM plan_cache WHERE keyword = ? AND template_json = ?",
+                    (keyword, template_json)
+                ).fetchone()
+                if not exists:
+                    stored = array('f', embedding)
+                    conn.execute(
+                        "INSERT INTO plan_cache (keyword, template_json, embedding) VALUES (?, ?, ?)",
+                        (keyword, template_json, stored.tobytes())
+                    )
+                    if self._rows is not None:
+                        self._rows.append((template_json, stored))
+        except sqlite3.Error as e:
+            logger.warning("写入规划缓存失败: %s", e)
+
+    def _load_rows(self) -> List[tuple]:
+        """加载全部缓存向量到内存（每个实例只读取一次数据库）"""
+        if self._rows is not None:
+            return self._rows
+
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                rows = conn.execute("SELECT template_json, embedding, scale FROM plan_cache").fetchall()
+        except sqlite3.Error as e:
+            logger.warning("读取规划缓存失败: %s", e)
+            return []
+
+        self._rows = []
+        for template_json, blob, scale in rows:
+            # 旧版本会缓存任意计划，含副作用工具的模板不再参与匹配
+            try:
+                if not is_replayable(json.loads(template_json)):
+                    continue
+            except ValueError:
+                continue
+            if scale is None:
+                stored = array('f')
+                stored.frombytes(blob)
+            else:
+                # int8 量化格式写入的向量，读取后还原为 float32
+                quantized = array('b')
+                quantized.frombytes(blob)
+                stored = array('f', (v * scale for v in quantized))
+            self._rows.append((template_json, stored))
+        return self._rows
+
+    def record_transition(self, prev_goal: str, goal: str, plan: List[Dict[str, Any]]):
+        """
+        记录目标之间的转移：`prev_goal` 之后执行了 `goal`，所用计划为 `plan`
+
+        Args:
+            prev_goal: 上一个成功执行的目标
+            goal: 当前成功执行的目标
+            plan: 当前目标成功执行的计划
+        """
+        prev_keyword = self.extract_keyword(prev_goal) if prev_goal else ''
+        if not prev_keyword or not plan:
+            return
+
+        template = self._generalize(plan, self._extract_entities(goal))
+        template_json = json.dumps(template, ensure_ascii=False, sort_keys=True)
+
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO plan_transition (prev_keyword, next_template_json) VALUES (?, ?)",
+                    (prev_keyword, template_json)
+                )
+        except sqlite3.Error as e:
+            logger.warning("写入规划转移表失败: %s", e)
+
+    def predict_next(self, prev_goal: str, goal: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        根据上一个目标预测当前目标最可能使用的计划
+
+        Args:
+            prev_goal: 上一个成功执行的目标
+            goal: 当前目标，用于填充模板中的具体值
+
+        Returns:
+            预测的计划，无记录时返回 None
+        """
+        prev_keyword = self.extract_keyword(prev_goal) if prev_goal else ''
+        if not prev_keyword:
+            return None
+
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                row = conn.execute(
+                    "SELECT next_template_json FROM plan_transition WHERE prev_keyword = ?",
+                    (prev_keyword,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("读取规划转移表失败: %s", e)
+            return None
+
+        if row is None:
+            return None
+
+        return self._fill_template(json.loads(row[0]), self._extract_entities(goal))
+
+    def extract_keyword(self, goal: str) -> str:
+        """提取目标关键词（去除具体值和停用词），用作缓存键"""
+        text = _ENTITY_RE.sub(' ', goal).lower()
+        tokens = set(_WORD_RE.findall(text))
+        for run in _CJK_RUN_RE.findall(text):
+            if len(run) == 1:
+                tokens.add(run)
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+        return ' '.join(sorted(tokens - _STOPWORDS))
+
+    def _embed(self, keyword: str) -> Optional[List[float]]:
+        """将关键词映射为归一化的特征哈希向量"""
+        if not keyword:
+            return None
+        vector = [0.0] * _EMBEDDING_DIM
+        for token in keyword.split(' '):
+            vector[zlib.crc32(token.encode('utf-8')) % _EMBEDDING_DIM] += 1.0
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector]
+
+    def _extract_entities(self, goal: str) -> List[str]:
+        """按出现顺序提取目标中的具体值（去重）"""
+        entities = []
+        for match in _ENTITY_RE.finditer(goal):
+            if match.group(0) not in entities:
+                entities.append(match.group(0))
+        return entities
+
+    def _generalize(self, value: Any, entities: List[str]) -> Any:
+        """将计划参数中来自目标的具体值和当前目录替换为占位符"""
+        if isinstance(value, str):
+            cwd = os.getcwd()
+            if len(cwd) > 1:
+                value = value.replace(cwd, _CWD_PLACEHOLDER)
+            # 先替换较长的值，避免短值截断长值
+            for index, entity in sorted(enumerate(entities), key=lambda x: -len(x[1])):
+                pattern = r'(?<![\w.])' + re.escape(entity) + r'(?![\w])'
+                value = re.sub(pattern, '{{ENTITY_%d}}' % index, value, flags=re.ASCII)
+            return value
+        if isinstance(value, list):
+            return [self._generalize(item, entities) for item in value]
+        if isinstance(value, dict):
+            return {k: self._generalize(v, entities) for k, v in value.items()}
+        return value
+
+    def _fill_template(self, template: Any, entities: List[str]) -> Optional[Any]:
+        """用新目标中的具体值替换模板占位符，值数量不足时视为未命中"""
+        try:
+            return self._substitute(template, entities, os.getcwd())
+        except IndexError:
+            return None
+
+    def _substitute(self, value: Any, entities: List[str], cwd: str) -> Any:
+        """递归替换模板中的占位符"""
+        if isinstance(value, str):
+            value = value.replace(_CWD_PLACEHOLDER, cwd)
+            return _PLACEHOLDER_RE.sub(lambda m: entities[int(m.group(1))], value)
+        if isinstance(value, list):
+            return [self._substitute(item, entities, cwd) for item in value]
+        if isinstance(value, dict):
+            return {k: self._substitute(v, entities, cwd) for k, v in value.items()}
+        return value
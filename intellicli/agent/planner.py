@@ -1,71 +1,23 @@
+import functools
 import json
+import logging
 import platform
 import os
+import queue
+import threading
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
-class Planner:
-    """
-    规划器负责将复杂的用户请求分解为一系列可操作的步骤 ("待办事项列表")。
-    """
-
-    def __init__(self, model_client):
-        """
-        使用模型客户端初始化规划器。
-
-        Args:
-            model_client: 继承自 BaseLLM 的类实例。
-        """
-        self.model_client = model_client
-
-    def create_plan(self, goal: str, tools: List[Dict[str, Any]], max_retries: int = 3) -> List[Dict[str, Any]]:
-        """
-        生成实现目标的逐步计划。如果模型未返回有效的 JSON 计划，它将重试最多
-        `max_retries` 次。
-        """
-        # 获取当前系统信息
-        system_info = self._get_system_info()
-        
-        # 构建详细的工具说明
-        tool_descriptions = []
-        for tool in tools:
-            tool_name = tool['name']
-            tool_desc = tool.get('description', '无描述')
-            
-            # 构建参数信息
-            param_info = []
-            for param in tool.get('parameters', []):
-                param_name = param['name']
-                param_type = param.get('type', 'Any')
-                required = param.get('required', True)
-                required_marker = " (必需)" if required else " (可选)"
-                param_info.append(f"  - {param_name}: {param_type}{required_marker}")
-            
-            if param_info:
-                tool_descriptions.append(f"- {tool_name}: {tool_desc}\n" + "\n".join(param_info))
-            else:
-                tool_descriptions.append(f"- {tool_name}: {tool_desc}")
-        
-        prompt = f"""
-您是一位运行在 {system_info['os_name']} 系统上的智能任务规划代理（IntelliCLI）。您的任务是将一个高级目标分解为一系列精确、可执行的步骤。
+logger = logging.getLogger(__name__)
 
-**当前系统环境:**
-- 操作系统: {system_info['os_name']} ({system_info['os_version']})
-- 系统架构: {system_info['architecture']}
-- 当前时间: {system_info['current_time']}
-- 工作目录: {system_info['current_directory']}
-- Python 版本: {system_info['python_version']}
-- Shell 环境: {system_info['shell']}
-
-**目标:**
-{goal}
-
-**可用工具及其参数:**
-{chr(10).join(tool_descriptions)}
+# 规划提示词的静态前缀：角色、规则、格式要求和示例在多次调用间完全一致，
+# 放在最前面以便支持提示缓存的模型供应商复用
+_PLAN_PROMPT_STATIC = """
+您是一位智能任务规划代理（IntelliCLI）。您的任务是将一个高级目标分解为一系列精确、可执行的步骤。
 
 **关键规则:**
 1. 仔细分析目标，明确用户的核心需求，选择最合适的工具
-2. 使用正确的参数名称（如上所示）
+2. 使用正确的参数名称（见下方工具列表）
 3. 确保参数类型正确
 4. 根据当前系统环境调整命令和路径
 5. 创建逻辑清晰的步骤序列
@@ -76,25 +28,97 @@ class Planner:
 
 **JSON 格式要求:**
 - 每个步骤包含: "step" (整数), "tool" (工具名), "arguments" (参数字典)
-- 参数名称必须与上述工具定义完全匹配
-- 只使用上述列出的工具
+- 参数名称必须与下方工具定义完全匹配
+- 只使用下方列出的工具
 
 **响应示例:**
 ```json
 [
-    {{
+    {
         "step": 1,
         "tool": "list_directory",
-        "arguments": {{
+        "arguments": {
             "path": "."
-        }}
-    }},
-    {{
+        }
+    },
+    {
         "step": 2,
         "tool": "write_file",
-        "arguments": {{
+        "arguments": {
             "path": "/path/to/file.txt",
             "content": "文件内容"
+        }
+    }
+]
+```
+
+**可用工具及其参数:**
+"""
+
+# 规划提示词的动态部分：系统环境和目标放在最后
+_PLAN_PROMPT_DYNAMIC = """
+
+**当前目标与环境:**
+- 操作系统: {os_name} ({os_version})
+- 系统架构: {architecture}
+- Python 版本: {python_version}
+- Shell 环境: {shell}
+- 工作目录: {current_directory}
+- 当前时间: {current_time}
+
+**目标:**
+{goal}
+
+**您的响应必须仅是 JSON 数组，不要包含任何其他内容。**
+"""
+
+# 续接规划提示词模板
+_CONTINUATION_PROMPT_TEMPLATE = """
+您是一位智能任务续接规划代理。您需要分析已有的执行情况，生成续接计划来完成剩余的工作。
+
+**⚠️ 重要：不要重复已经成功完成的步骤！**
+
+**原始目标:**
+{original_goal}
+
+**当前系统环境:**
+- 操作系统: {os_name} ({os_version})
+- 工作目录: {current_directory}
+- 当前时间: {current_time}
+
+**已成功完成的步骤 (请勿重复):**
+{completed_summary}
+
+**失败的步骤 (需要修复或替代):**
+{failed_summary}
+
+**最后一次成功输出 (可作为起点):**
+{last_successful_output}
+
+**可用工具及其参数:**
+{tool_descriptions}
+
+**续接规划要求:**
+1. 分析当前状态：已完成了什么，失败在哪里
+2. 从失败位置开始规划，不重复成功步骤
+3. 如果需要使用前面成功步骤的输出，使用 "<PREVIOUS_STEP_OUTPUT>" 占位符
+4. 修复失败的操作或使用替代方案
+5. 确保能达成原始目标的剩余部分
+6. 步骤编号从 {next_step} 开始
+
+**JSON 格式要求:**
+- 每个步骤包含: "step" (整数), "tool" (工具名), "arguments" (参数字典)
+- 参数名称必须与工具定义完全匹配
+- 只使用上述列出的工具
+
+**响应示例:**
+```json
+[
+    {{
+        "step": {next_step},
+        "tool": "工具名",
+        "arguments": {{
+            "参数名": "参数值"
         }}
     }}
 ]
@@ -102,35 +126,151 @@ class Planner:
 
 **您的响应必须仅是 JSON 数组，不要包含任何其他内容。**
 """
-        
-        for attempt in range(max_retries):
-            print(f"规划尝试 {attempt + 1}/{max_retries}...")
-            response_text = self.model_client.generate(prompt)
+
+_JSON_DECODER = json.JSONDecoder()
+# 解析 JSON 数组时最多尝试的 '[' 位置数
+_MAX_ARRAY_CANDIDATES = 20
+
+
+def extract_json_array(response_text: str) -> Optional[Any]:
+    """
+    从模型响应中解析第一个 JSON 数组。
+
+    从 '[' 处开始解码，数组闭合即停止，不再扫描其后的内容；若该处不是合法的
+    JSON（例如说明文字中的 "[注意]"），则从下一个 '[' 继续尝试。
+    未找到数组时返回 None，所有候选位置都无法解析时抛出首个 JSONDecodeError。
+    """
+    json_start = response_text.find('[')
+    if json_start == -1:
+        return None
+
+    first_error = None
+    for _ in range(_MAX_ARRAY_CANDIDATES):
+        try:
+            return _JSON_DECODER.raw_decode(response_text, json_start)[0]
+        except json.JSONDecodeError as e:
+            first_error = first_error or e
+        json_start = response_text.find('[', json_start + 1)
+        if json_start == -1:
+            break
+    raise first_error
+
+
+@functools.lru_cache(maxsize=8)
+def _build_tool_schemas(tools_fingerprint: tuple) -> Dict[str, tuple]:
+    """
+    根据工具指纹构建每个工具的参数校验表：工具名 -> (参数名列表, 全部参数集合, 必需参数集合)。
+    工具集不变时多次验证直接复用。
+    """
+    schemas = {}
+    for name, params in tools_fingerprint:
+        param_names = [param_name for param_name, _ in params]
+        schemas[name] = (
+            param_names,
+            frozenset(param_names),
+            frozenset(param_name for param_name, required in params if required)
+        )
+    return schemas
+
+
+# 已渲染的工具说明，按工具集内容缓存
+_TOOL_DESC_CACHE: Dict[tuple, str] = {}
+_TOOL_DESC_CACHE_SIZE = 32
+
+
+def _render_tool_descriptions(tools: List[Dict[str, Any]]) -> str:
+    """
+    渲染工具及其参数说明。工具列表通常在多次规划间不变，渲染结果按内容缓存。
+    """
+    key = tuple(
+        (tool['name'], tool.get('description', '无描述'), tuple(
+            (param['name'], param.get('type', 'Any'), param.get('required', True))
+            for param in tool.get('parameters', [])
+        ))
+        for tool in tools
+    )
+    rendered = _TOOL_DESC_CACHE.get(key)
+    if rendered is None:
+        rendered = "\n".join(
+            "".join(
+                [f"- {name}: {desc}"] + [
+                    f"\n  - {param_name}: {param_type}{' (必需)' if required else ' (可选)'}"
+                    for param_name, param_type, required in params
+                ]
+            )
+            for name, desc, params in key
+        )
+        if len(_TOOL_DESC_CACHE) >= _TOOL_DESC_CACHE_SIZE:
+            _TOOL_DESC_CACHE.clear()
+        _TOOL_DESC_CACHE[key] = rendered
+    return rendered
+
+
+def hedge_delay_from_config(config: Dict[str, Any]) -> Optional[float]:
+    """读取 planner.hedge_delay 配置，未设置时返回 None（不对冲）"""
+    hedge_delay = ((config or {}).get('planner') or {}).get('hedge_delay')
+    return float(hedge_delay) if hedge_delay else None
+
+
+class Planner:
+    """
+    规划器负责将复杂的用户请求分解为一系列可操作的步骤 ("待办事项列表")。
+    """
+
+    def __init__(self, model_client, plan_cache=None, speculator=None, hedge_delay: Optional[float] = None):
+        """
+        使用模型客户端初始化规划器。
+
+        Args:
+            model_client: 继承自 BaseLLM 的类实例。
+            plan_cache: 可选的 PlanCache 实例，命中时跳过模型规划。
+            speculator: 可选的回调，接收预测的计划，在模型规划期间提前执行其只读步骤
+                        （通常为 Executor.speculate）。
+            hedge_delay: 规划请求超过该秒数未返回时追加对冲请求（额外的付费模型调用）；
+                         默认为 None，不对冲，只在请求失败或响应无效后才重试。
+        """
+        self.model_client = model_client
+        self.plan_cache = plan_cache
+        self.speculator = speculator
+        self.hedge_delay = hedge_delay
+        self._last_successful_goal = None
+
+    def create_plan(self, goal: str, tools: List[Dict[str, Any]], max_retries: int = 3, cache_key: str = None) -> List[Dict[str, Any]]:
+        """
+        生成实现目标的逐步计划。如果模型未返回有效的 JSON 计划，它将重试最多
+        `max_retries` 次。
+
+        `cache_key` 用于规划缓存查找，默认为 `goal`；当 `goal` 是包含上下文的
+        完整提示时，应传入用户的原始目标。
+        """
+        # 优先复用缓存的规划模板
+        if self.plan_cache is not None:
+            cached_plan = self.plan_cache.lookup(cache_key or goal)
+            if cached_plan and self._validate_plan(cached_plan, tools):
+                logger.info("命中规划缓存，跳过模型规划。")
+                return cached_plan
             
-            # 清理响应以仅提取 JSON 部分
-            try:
-                # 查找 JSON 数组的开始位置
-                json_start = response_text.find('[')
-                # 查找 JSON 数组的结束位置
-                json_end = response_text.rfind(']') + 1
-                
-                if json_start != -1 and json_end != 0:
-                    clean_response = response_text[json_start:json_end]
-                    plan = json.loads(clean_response)
-                    
-                    # 验证计划格式
-                    if self._validate_plan(plan, tools):
-                        return plan
-                    else:
-                        print("生成的计划格式或内容不正确。")
-                else:
-                    print("响应中未找到有效的 JSON 数组。")
-            except (json.JSONDecodeError, IndexError) as e:
-                print(f"尝试 {attempt + 1} 失败: 无法从响应中解析出有效的 JSON。错误: {e}")
-                print(f"原始响应: {response_text[:500]}...")
-                continue
+            # 根据上一个目标预测本次计划，在等待模型时提前执行其只读步骤
+            if self.speculator is not None:
+                predicted_plan = self.plan_cache.predict_next(self._last_successful_goal, cache_key or goal)
+                if predicted_plan:
+                    self.speculator(predicted_plan)
+        
+        # 获取当前系统信息
+        system_info = self._get_system_info()
+        
+        # 构建详细的工具说明（按工具集缓存）
+        tool_descriptions = _render_tool_descriptions(tools)
+        
+        # 静态前缀 + 工具说明在多次调用间保持一致，动态内容放在最后
+        static_prefix = _PLAN_PROMPT_STATIC + tool_descriptions
+        prompt = static_prefix + _PLAN_PROMPT_DYNAMIC.format_map(dict(system_info, goal=goal))
+        
+        plan = self._generate_plan(prompt, tools, max_retries, "规划", cache_breakpoint=len(static_prefix))
+        if plan:
+            return plan
 
-        print("错误: 模型在多次尝试后未能生成有效的计划。")
+        logger.error("错误: 模型在多次尝试后未能生成有效的计划。")
         return []
 
     def create_continuation_plan(
@@ -157,25 +297,8 @@ class Planner:
         # 获取当前系统信息
         system_info = self._get_system_info()
         
-        # 构建详细的工具说明
-        tool_descriptions = []
-        for tool in tools:
-            tool_name = tool['name']
-            tool_desc = tool.get('description', '无描述')
-            
-            # 构建参数信息
-            param_info = []
-            for param in tool.get('parameters', []):
-                param_name = param['name']
-                param_type = param.get('type', 'Any')
-                required = param.get('required', True)
-                required_marker = " (必需)" if required else " (可选)"
-                param_info.append(f"  - {param_name}: {param_type}{required_marker}")
-            
-            if param_info:
-                tool_descriptions.append(f"- {tool_name}: {tool_desc}\n" + "\n".join(param_info))
-            else:
-                tool_descriptions.append(f"- {tool_name}: {tool_desc}")
+        # 构建详细的工具说明（按工具集缓存）
+        tool_descriptions = _render_tool_descriptions(tools)
         
         # 构建已完成步骤的摘要
         completed_summary = []
@@ -183,9 +306,10 @@ class Planner:
         for step in completed_steps:
             step_info = f"步骤 {step.get('step', '?')}: {step.get('tool', '未知')} - 成功"
             if step.get('output'):
-                output_preview = str(step['output'])[:100] + "..." if len(str(step['output'])) > 100 else str(step['output'])
+                output_text = str(step['output'])
+                output_preview = output_text[:100] + "..." if len(output_text) > 100 else output_text
                 step_info += f" (输出: {output_preview})"
-                last_successful_output = str(step['output'])
+                last_successful_output = output_text
             completed_summary.append(step_info)
         
         # 构建失败步骤的摘要
@@ -196,134 +320,153 @@ class Planner:
                 step_info += f" (错误: {step['error']})"
             failed_summary.append(step_info)
         
-        prompt = f"""
-您是一位智能任务续接规划代理。您需要分析已有的执行情况，生成续接计划来完成剩余的工作。
-
-**⚠️ 重要：不要重复已经成功完成的步骤！**
-
-**原始目标:**
-{original_goal}
-
-**当前系统环境:**
-- 操作系统: {system_info['os_name']} ({system_info['os_version']})
-- 工作目录: {system_info['current_directory']}
-- 当前时间: {system_info['current_time']}
-
-**已成功完成的步骤 (请勿重复):**
-{chr(10).join(completed_summary) if completed_summary else "暂无"}
-
-**失败的步骤 (需要修复或替代):**
-{chr(10).join(failed_summary) if failed_summary else "暂无"}
-
-**最后一次成功输出 (可作为起点):**
-{last_successful_output if last_successful_output else "无"}
-
-**可用工具及其参数:**
-{chr(10).join(tool_descriptions)}
-
-**续接规划要求:**
-1. 分析当前状态：已完成了什么，失败在哪里
-2. 从失败位置开始规划，不重复成功步骤
-3. 如果需要使用前面成功步骤的输出，使用 "<PREVIOUS_STEP_OUTPUT>" 占位符
-4. 修复失败的操作或使用替代方案
-5. 确保能达成原始目标的剩余部分
-6. 步骤编号从 {len(completed_steps) + 1} 开始
-
-**JSON 格式要求:**
-- 每个步骤包含: "step" (整数), "tool" (工具名), "arguments" (参数字典)
-- 参数名称必须与工具定义完全匹配
-- 只使用上述列出的工具
+        prompt = _CONTINUATION_PROMPT_TEMPLATE.format_map(dict(
+            system_info,
+            original_goal=original_goal,
+            completed_summary="\n".join(completed_summary) if completed_summary else "暂无",
+            failed_summary="\n".join(failed_summary) if failed_summary else "暂无",
+            last_successful_output=last_successful_output or "无",
+            tool_descriptions=tool_descriptions,
+            next_step=len(completed_steps) + 1
+        ))
+        
+        plan = self._generate_plan(prompt, tools, max_retries, "续接规划")
+        if plan:
+            logger.info("生成续接计划，包含 %d 个步骤", len(plan))
+            return plan
 
-**响应示例:**
-```json
-[
-    {{
-        "step": {len(completed_steps) + 1},
-        "tool": "工具名",
-        "arguments": {{
-            "参数名": "参数值"
-        }}
-    }}
-]
-```
+        logger.error("错误: 模型在多次尝试后未能生成有效的续接计划。")
+        return []
 
-**您的响应必须仅是 JSON 数组，不要包含任何其他内容。**
-"""
+    def _generate_plan(self, prompt: str, tools: List[Dict[str, Any]], max_retries: int, label: str, cache_breakpoint: int = None) -> List[Dict[str, Any]]:
+        """
+        发起规划请求，返回最先通过验证的计划，最多发起 `max_retries` 次请求。
+        
+        先只发起一次请求；该请求失败或响应无效时发起下一次。设置了 `hedge_delay`
+        时，请求超过该秒数仍未返回也会追加一次请求，与之前的请求同时等待；
+        采用先返回的有效计划后，其余请求仍会在守护线程中运行到结束并照常计费，
+        但不会阻塞进程退出。
+        `cache_breakpoint` 为提示中静态前缀的结束位置，仅传给支持提示缓存的客户端。
+        """
+        attempts = max(1, max_retries)
+        
+        generate_kwargs = {}
+        if cache_breakpoint and getattr(self.model_client, 'supports_cache_breakpoints', False):
+            generate_kwargs['cache_breakpoints'] = [cache_breakpoint]
         
-        for attempt in range(max_retries):
-            print(f"续接规划尝试 {attempt + 1}/{max_retries}...")
-            response_text = self.model_client.generate(prompt)
+        results = queue.Queue()
+        
+        def run_attempt(attempt: int):
+            try:
+                results.put((attempt, self.model_client.generate(prompt, **generate_kwargs), None))
+            except Exception as e:
+                results.put((attempt, None, e))
+        
+        started = 0
+        pending = 0
+        while True:
+            # 首次进入、上一次请求失败或等待超时时发起下一次尝试
+            if started < attempts:
+                started += 1
+                pending += 1
+                if started > 1:
+                    logger.info("%s: 发起第 %d 次尝试...", label, started)
+                threading.Thread(target=run_attempt, args=(started,), daemon=True).start()
+            elif pending == 0:
+                return []
             
-            # 清理响应以仅提取 JSON 部分
             try:
-                # 查找 JSON 数组的开始位置
-                json_start = response_text.find('[')
-                # 查找 JSON 数组的结束位置
-                json_end = response_text.rfind(']') + 1
-                
-                if json_start != -1 and json_end != 0:
-                    clean_response = response_text[json_start:json_end]
-                    plan = json.loads(clean_response)
-                    
-                    # 验证计划格式
-                    if self._validate_plan(plan, tools):
-                        print(f"生成续接计划，包含 {len(plan)} 个步骤")
-                        return plan
-                    else:
-                        print("生成的续接计划格式或内容不正确。")
-                else:
-                    print("响应中未找到有效的 JSON 数组。")
-            except (json.JSONDecodeError, IndexError) as e:
-                print(f"续接规划尝试 {attempt + 1} 失败: 无法从响应中解析出有效的 JSON。错误: {e}")
-                print(f"原始响应: {response_text[:500]}...")
+                attempt, response_text, error = results.get(
+                    timeout=self.hedge_delay if started < attempts else None
+                )
+            except queue.Empty:
                 continue
+            pending -= 1
+            
+            if error is not None:
+                logger.warning("%s尝试 %d 失败: 模型调用出错。错误: %s", label, attempt, error)
+                continue
+            
+            plan = self._parse_plan_response(response_text, tools, label, attempt)
+            if plan is not None:
+                return plan
 
-        print("错误: 模型在多次尝试后未能生成有效的续接计划。")
-        return []
-
-    def _get_system_info(self) -> Dict[str, str]:
+    def _parse_plan_response(self, response_text: str, tools: List[Dict[str, Any]], label: str, attempt: int) -> Optional[List[Dict[str, Any]]]:
         """
-        获取当前系统环境信息。
+        从模型响应中提取并验证 JSON 计划，无效时返回 None。
         """
+        # 提取响应中的 JSON 数组
         try:
-            # 获取操作系统信息
-            os_name = platform.system()
-            if os_name == "Darwin":
-                os_name = "macOS"
-            elif os_name == "Windows":
-                os_name = "Windows"
-            elif os_name == "Linux":
-                os_name = "Linux"
+            plan = extract_json_array(response_text)
             
+            if plan is not None:
+                # 验证计划格式
+                if self._validate_plan(plan, tools):
+                    return plan
+                logger.warning("%s尝试 %d: 生成的计划格式或内容不正确。", label, attempt)
+            else:
+                logger.warning("%s尝试 %d: 响应中未找到有效的 JSON 数组。", label, attempt)
+        except (json.JSONDecodeError, IndexError) as e:
+            logger.warning("%s尝试 %d 失败: 无法从响应中解析出有效的 JSON。错误: %s", label, attempt, e)
+            logger.debug("原始响应: %.500s...", response_text)
+        return None
+
+    def record_successful_plan(self, goal: str, plan: List[Dict[str, Any]]):
+        """
+        记录一次成功执行的计划，供相似目标复用。
+
+        Args:
+            goal: 用户的原始目标（与 create_plan 的 cache_key 一致）
+            plan: 全部步骤执行成功的计划
+        """
+        if self.plan_cache is not None:
+            self.plan_cache.store(goal, plan)
+            self.plan_cache.record_transition(self._last_successful_goal, goal, plan)
+        self._last_successful_goal = goal
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def _get_static_system_info() -> Dict[str, str]:
+        """
+        获取进程生命周期内不变的系统信息（只计算一次）。
+        """
+        # 获取操作系统信息
+        os_name = platform.system()
+        if os_name == "Darwin":
+            os_name = "macOS"
+        elif os_name == "Windows":
+            os_name = "Windows"
+        elif os_name == "Linux":
+            os_name = "Linux"
+        
+        return {
+            'os_name': os_name,
             # 获取详细版本信息
-            os_version = platform.platform()
-            
+            'os_version': platform.platform(),
             # 获取系统架构
-            architecture = platform.machine()
+            'architecture': platform.machine(),
+            # 获取Python版本
+            'python_version': platform.python_version(),
+            # 获取Shell环境
+            'shell': os.environ.get('SHELL', 'unknown')
+        }
+
+    def _get_system_info(self) -> Dict[str, str]:
+        """
+        获取当前系统环境信息，仅当前时间和工作目录每次重新获取。
+        """
+        try:
+            system_info = dict(self._get_static_system_info())
             
             # 获取当前时间
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            system_info['current_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
             # 获取当前工作目录
-            current_directory = os.getcwd()
+            system_info['current_directory'] = os.getcwd()
             
-            # 获取Python版本
-            python_version = platform.python_version()
-            
-            # 获取Shell环境
-            shell = os.environ.get('SHELL', 'unknown')
-            
-            return {
-                'os_name': os_name,
-                'os_version': os_version,
-                'architecture': architecture,
-                'current_time': current_time,
-                'current_directory': current_directory,
-                'python_version': python_version,
-                'shell': shell
-            }
+            return system_info
         except Exception as e:
-            print(f"获取系统信息时出错: {e}")
+            logger.warning("获取系统信息时出错: %s", e)
             return {
                 'os_name': 'unknown',
                 'os_version': 'unknown',
@@ -339,54 +482,55 @@ class Planner:
         验证计划的格式和内容是否正确。
         """
         if not isinstance(plan, list):
-            print("计划不是列表格式")
+            logger.debug("计划不是列表格式")
             return False
         
         if len(plan) == 0:
-            print("计划为空")
+            logger.debug("计划为空")
             return False
         
-        # 创建工具名称到工具信息的映射
-        tool_map = {tool['name']: tool for tool in tools}
+        # 按工具指纹缓存的参数校验表
+        tools_fingerprint = tuple(
+            (tool['name'], tuple((p['name'], p.get('required', True)) for p in tool.get('parameters', [])))
+            for tool in tools
+        )
+        tool_schemas = _build_tool_schemas(tools_fingerprint)
         
         for i, step in enumerate(plan):
             step_num = i + 1
             
             if not isinstance(step, dict):
-                print(f"步骤 {step_num} 不是字典格式")
+                logger.debug("步骤 %d 不是字典格式", step_num)
                 return False
             
             required_keys = ['step', 'tool', 'arguments']
             if not all(key in step for key in required_keys):
-                print(f"步骤 {step_num} 缺少必要的键: {required_keys}")
+                logger.debug("步骤 %d 缺少必要的键: %s", step_num, required_keys)
                 return False
             
             tool_name = step['tool']
-            if tool_name not in tool_map:
-                print(f"步骤 {step_num} 使用了不存在的工具: {tool_name}")
+            schema = tool_schemas.get(tool_name)
+            if schema is None:
+                logger.debug("步骤 %d 使用了不存在的工具: %s", step_num, tool_name)
                 return False
             
             if not isinstance(step['arguments'], dict):
-                print(f"步骤 {step_num} 的参数不是字典格式")
+                logger.debug("步骤 %d 的参数不是字典格式", step_num)
                 return False
             
             # 验证参数名称
-            tool_info = tool_map[tool_name]
-            expected_params = {p['name']: p for p in tool_info.get('parameters', [])}
-            provided_params = set(step['arguments'].keys())
+            param_names, expected_params, required_params = schema
+            provided_params = step['arguments'].keys()
             
-            # 检查无效参数
-            invalid_params = provided_params - set(expected_params.keys())
-            if invalid_params:
-                print(f"步骤 {step_num} 工具 {tool_name} 包含无效参数: {invalid_params}")
-                print(f"  期望参数: {list(expected_params.keys())}")
+            # 检查无效参数（子集判断不构建中间集合，仅在出错时计算差集用于提示）
+            if not provided_params <= expected_params:
+                logger.debug("步骤 %d 工具 %s 包含无效参数: %s", step_num, tool_name, provided_params - expected_params)
+                logger.debug("  期望参数: %s", param_names)
                 return False
             
             # 检查必需参数是否提供
-            required_params = {name for name, info in expected_params.items() if info.get('required', True)}
-            missing_params = required_params - provided_params
-            if missing_params:
-                print(f"步骤 {step_num} 工具 {tool_name} 缺少必需参数: {missing_params}")
+            if not required_params <= provided_params:
+                logger.debug("步骤 %d 工具 %s 缺少必需参数: %s", step_num, tool_name, required_params - provided_params)
                 return False
         
         return True
\ No newline at end of file
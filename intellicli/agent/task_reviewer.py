@@ -4,20 +4,95 @@
 """
 
 import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+from .planner import extract_json_array
+from ..models.cached_client import CachedModelClient
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+
+def _dumps_indented(obj: Any) -> str:
+    """将对象序列化为带缩进的 JSON 文本，用于嵌入复盘提示词"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+    return json.dumps(obj, ensure_ascii=False, indent=2)
+
+
+def _join_indented(item_dumps: List[str]) -> str:
+    """将逐项序列化的 JSON 文本拼接为带缩进的 JSON 数组（与整体序列化结果一致）"""
+    if not item_dumps:
+        return "[]"
+    return "[\n" + ",\n".join("  " + item.replace("\n", "\n  ") for item in item_dumps) + "\n]"
+
+
+_PREV_SENTINEL = '<PREVIOUS_STEP_OUTPUT>'
+
+
+def _contains_prev(obj: Any) -> bool:
+    """递归检查参数中是否包含前一步输出占位符，命中即返回"""
+    if isinstance(obj, str):
+        return _PREV_SENTINEL in obj
+    if isinstance(obj, dict):
+        return any(_contains_prev(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_contains_prev(item) for item in obj)
+    return False
+
+
+@dataclass
+class ExecutionStats:
+    """执行结果统计（单次遍历得到）"""
+    total: int = 0
+    completed: int = 0
+    failed: int = 0
+    failed_tools: List[str] = field(default_factory=list)
+    failed_reasons: List[str] = field(default_factory=list)
+    failed_step_indices: List[int] = field(default_factory=list)
+    failed_results: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _summarize_results(execution_results: List[Dict[str, Any]]) -> ExecutionStats:
+    """一次遍历执行结果，统计成功/失败步骤及失败详情"""
+    stats = ExecutionStats(total=len(execution_results))
+    for i, result in enumerate(execution_results):
+        status = result.get('status')
+        if status == 'completed':
+            stats.completed += 1
+        elif status == 'failed':
+            stats.failed += 1
+            stats.failed_tools.append(result.get('tool', 'unknown'))
+            stats.failed_reasons.append(result.get('error', 'unknown error'))
+            stats.failed_step_indices.append(i)
+            stats.failed_results.append(result)
+    return stats
+
+
 class TaskReviewer:
     """任务复盘分析器"""
     
-    def __init__(self, model_client):
+    def __init__(self, model_client, response_cache_path: str = None):
         """
         初始化复盘分析器
         
         Args:
             model_client: 模型客户端，用于分析和生成建议
+            response_cache_path: 可选的响应缓存文件路径，提供时缓存跨进程复用
         """
-        self.model_client = model_client
+        # 复盘同一执行记录时提示完全相同，重复的模型调用直接命中缓存
+        if isinstance(model_client, CachedModelClient):
+            self.model_client = model_client
+        else:
+            self.model_client = CachedModelClient(model_client, db_path=response_cache_path)
         
     def review_task_execution(
         self, 
@@ -40,26 +115,45 @@ class TaskReviewer:
         """
         context = context or {}
         
-        # 基础分析
-        basic_analysis = self._analyze_execution_basics(execution_plan, execution_results)
-        
-        # 目标达成度分析
-        goal_achievement = self._analyze_goal_achievement(
-            original_goal, execution_plan, execution_results, context
-        )
-        
-        # 问题识别
-        issues_identified = self._identify_issues(execution_plan, execution_results)
-        
-        # 改进建议
-        improvement_suggestions = self._generate_improvement_suggestions(
-            original_goal, execution_plan, execution_results, issues_identified
-        )
+        # 执行结果只遍历一次，各项分析共用统计结果
+        stats = _summarize_results(execution_results)
         
-        # 补充方案
-        supplementary_plan = self._generate_supplementary_plan(
-            original_goal, execution_results, issues_identified
-        )
+        # 基础分析
+        basic_analysis = self._analyze_execution_basics(execution_plan, stats)
+        
+        # 问题识别（本地计算，后两项模型分析依赖其结果）
+        issues_identified = self._identify_issues(execution_plan, execution_results, stats)
+        
+        # 每个结果和问题只序列化一次，完整列表与子集（失败步骤、关键问题）共用
+        plan_json = _dumps_indented(execution_plan)
+        result_dumps = [_dumps_indented(result) for result in execution_results]
+        results_json = _join_indented(result_dumps)
+        failed_steps_json = _join_indented([result_dumps[i] for i in stats.failed_step_indices])
+        issue_dumps = [_dumps_indented(issue) for issue in issues_identified]
+        issues_json = _join_indented(issue_dumps)
+        high_priority_dumps = [
+            dump for issue, dump in zip(issues_identified, issue_dumps) if issue.get('severity') == 'high'
+        ]
+        high_priority_issues_json = _join_indented(high_priority_dumps)
+        needs_supplement = bool(stats.failed or high_priority_dumps)
+        
+        # 目标达成度分析、改进建议、补充方案三次模型调用互不依赖，并行执行
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            goal_future = executor.submit(
+                self._analyze_goal_achievement,
+                original_goal, plan_json, results_json, context
+            )
+            suggestions_future = executor.submit(
+                self._generate_improvement_suggestions,
+                original_goal, execution_plan, stats, issues_json
+            )
+            supplement_future = executor.submit(
+                self._generate_supplementary_plan,
+                original_goal, failed_steps_json, high_priority_issues_json
+            ) if needs_supplement else None
+            goal_achievement = goal_future.result()
+            improvement_suggestions = suggestions_future.result()
+            supplementary_plan = supplement_future.result() if supplement_future else None
         
         review_result = {
             "review_timestamp": datetime.now().isoformat(),
@@ -79,40 +173,29 @@ class TaskReviewer:
     def _analyze_execution_basics(
         self, 
         execution_plan: List[Dict[str, Any]], 
-        execution_results: List[Dict[str, Any]]
+        stats: ExecutionStats
     ) -> Dict[str, Any]:
         """分析执行基础指标"""
         total_steps = len(execution_plan)
-        completed_steps = len([r for r in execution_results if r.get('status') == 'completed'])
-        failed_steps = len([r for r in execution_results if r.get('status') == 'failed'])
-        
-        success_rate = (completed_steps / total_steps * 100) if total_steps > 0 else 0
-        
-        # 分析失败步骤的类型
-        failed_tools = []
-        failed_reasons = []
-        for result in execution_results:
-            if result.get('status') == 'failed':
-                failed_tools.append(result.get('tool', 'unknown'))
-                failed_reasons.append(result.get('error', 'unknown error'))
+        success_rate = (stats.completed / total_steps * 100) if total_steps > 0 else 0
         
         return {
             "total_steps": total_steps,
-            "completed_steps": completed_steps,
-            "failed_steps": failed_steps,
+            "completed_steps": stats.completed,
+            "failed_steps": stats.failed,
             "success_rate": round(success_rate, 2),
-            "failed_tools": failed_tools,
-            "failed_reasons": failed_reasons
+            "failed_tools": list(stats.failed_tools),
+            "failed_reasons": list(stats.failed_reasons)
         }
     
     def _analyze_goal_achievement(
         self,
         original_goal: str,
-        execution_plan: List[Dict[str, Any]],
-        execution_results: List[Dict[str, Any]],
+        plan_json: str,
+        results_json: str,
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
-        """分析目标达成度"""
+        """分析目标达成度（计划和结果以序列化后的 JSON 文本传入）"""
         # 构建分析提示
         analysis_prompt = f"""
 作为一个专业的任务分析师，请分析以下任务执行情况是否达成了原始目标。
@@ -121,10 +204,10 @@ class TaskReviewer:
 {original_goal}
 
 执行计划：
-{json.dumps(execution_plan, ensure_ascii=False, indent=2)}
+{plan_json}
 
 执行结果：
-{json.dumps(execution_results, ensure_ascii=False, indent=2)}
+{results_json}
 
 请从以下维度进行分析：
 1. 目标达成度（0-100%）
@@ -148,7 +231,7 @@ class TaskReviewer:
             response = self.model_client.generate(analysis_prompt)
             # 尝试解析JSON响应
             if response.strip().startswith('{'):
-                analysis_result = json.loads(response)
+                analysis_result = _loads(response)
             else:
                 # 如果不是JSON格式，提取关键信息
                 analysis_result = self._extract_achievement_info(response)
@@ -168,22 +251,23 @@ class TaskReviewer:
     def _identify_issues(
         self,
         execution_plan: List[Dict[str, Any]],
-        execution_results: List[Dict[str, Any]]
+        execution_results: List[Dict[str, Any]],
+        stats: ExecutionStats
     ) -> List[Dict[str, Any]]:
         """识别执行过程中的问题"""
         issues = []
         
         # 1. 直接失败的步骤
-        for i, result in enumerate(execution_results):
-            if result.get('status') == 'failed':
-                issues.append({
-                    "type": "execution_failure",
-                    "step_number": i + 1,
-                    "tool": result.get('tool', 'unknown'),
-                    "error": result.get('error', 'unknown error'),
-                    "severity": "high",
-                    "description": f"步骤 {i + 1} ({result.get('tool')}) 执行失败"
-                })
+        for i, result, tool, error in zip(stats.failed_step_indices, stats.failed_results,
+                                          stats.failed_tools, stats.failed_reasons):
+            issues.append({
+                "type": "execution_failure",
+                "step_number": i + 1,
+                "tool": tool,
+                "error": error,
+                "severity": "high",
+                "description": f"步骤 {i + 1} ({result.get('tool')}) 执行失败"
+            })
         
         # 2. 计划质量问题
         plan_issues = self._analyze_plan_quality(execution_plan, execution_results)
@@ -219,13 +303,10 @@ class TaskReviewer:
                 "suggestion": "考虑合并相关步骤或简化流程"
             })
         
-        # 检查步骤依赖关系
-        has_dependency_issues = False
-        for i, step in enumerate(execution_plan):
-            args = step.get('arguments', {})
-            if '<PREVIOUS_STEP_OUTPUT>' in str(args) and i == 0:
-                has_dependency_issues = True
-                break
+        # 检查步骤依赖关系（只有第一步不应依赖前一步的输出）
+        has_dependency_issues = bool(execution_plan) and _contains_prev(
+            execution_plan[0].get('arguments', {})
+        )
         
         if has_dependency_issues:
             issues.append({
@@ -246,21 +327,18 @@ class TaskReviewer:
         issues = []
         
         # 统计工具使用情况
-        tool_usage = {}
-        for step in execution_plan:
-            tool = step.get('tool')
-            if tool:
-                tool_usage[tool] = tool_usage.get(tool, 0) + 1
-        
-        # 检查是否有工具使用过于频繁
-        for tool, count in tool_usage.items():
-            if count > 3:
-                issues.append({
-                    "type": "tool_usage",
-                    "severity": "medium",
-                    "description": f"工具 {tool} 使用过于频繁 ({count} 次)",
-                    "suggestion": f"考虑优化 {tool} 的使用方式或合并相关操作"
-                })
+        tool_usage = Counter(step.get('tool') for step in execution_plan if step.get('tool'))
+        
+        # 检查是否有工具使用过于频繁（按次数从高到低，低于阈值即停止）
+        for tool, count in tool_usage.most_common():
+            if count <= 3:
+                break
+            issues.append({
+                "type": "tool_usage",
+                "severity": "medium",
+                "description": f"工具 {tool} 使用过于频繁 ({count} 次)",
+                "suggestion": f"考虑优化 {tool} 的使用方式或合并相关操作"
+            })
         
         return issues
     
@@ -268,10 +346,10 @@ class TaskReviewer:
         self,
         original_goal: str,
         execution_plan: List[Dict[str, Any]],
-        execution_results: List[Dict[str, Any]],
-        issues: List[Dict[str, Any]]
+        stats: ExecutionStats,
+        issues_json: str
     ) -> List[Dict[str, Any]]:
-        """生成改进建议"""
+        """生成改进建议（问题列表以序列化后的 JSON 文本传入）"""
         # 构建改进建议提示
         suggestions_prompt = f"""
 作为一个专业的流程优化专家，请基于以下任务执行情况提供改进建议。
@@ -279,12 +357,12 @@ class TaskReviewer:
 原始目标：{original_goal}
 
 识别的问题：
-{json.dumps(issues, ensure_ascii=False, indent=2)}
+{issues_json}
 
 执行统计：
 - 总步骤：{len(execution_plan)}
-- 成功步骤：{len([r for r in execution_results if r.get('status') == 'completed'])}
-- 失败步骤：{len([r for r in execution_results if r.get('status') == 'failed'])}
+- 成功步骤：{stats.completed}
+- 失败步骤：{stats.failed}
 
 请提供3-5个具体的改进建议，每个建议应包含：
 1. 改进类型（plan_optimization/tool_selection/error_handling/efficiency）
@@ -320,17 +398,10 @@ class TaskReviewer:
     def _generate_supplementary_plan(
         self,
         original_goal: str,
-        execution_results: List[Dict[str, Any]],
-        issues: List[Dict[str, Any]]
+        failed_steps_json: str,
+        high_priority_issues_json: str
     ) -> Optional[List[Dict[str, Any]]]:
-        """生成补充计划"""
-        # 检查是否需要补充计划
-        failed_steps = [r for r in execution_results if r.get('status') == 'failed']
-        high_priority_issues = [i for i in issues if i.get('severity') == 'high']
-        
-        if not failed_steps and not high_priority_issues:
-            return None
-        
+        """生成补充计划（仅在存在失败步骤或关键问题时调用，两者以序列化后的 JSON 文本传入）"""
         # 构建补充计划提示
         supplement_prompt = f"""
 基于以下任务执行情况，生成一个补充计划来解决未完成的部分。
@@ -338,10 +409,10 @@ class TaskReviewer:
 原始目标：{original_goal}
 
 失败的步骤：
-{json.dumps(failed_steps, ensure_ascii=False, indent=2)}
+{failed_steps_json}
 
 关键问题：
-{json.dumps(high_priority_issues, ensure_ascii=False, indent=2)}
+{high_priority_issues_json}
 
 请生成一个补充计划，包含2-4个步骤来：
 1. 修复失败的操作
@@ -439,11 +510,9 @@ class TaskReviewer:
         """从响应中提取改进建议"""
         try:
             # 尝试解析JSON
-            if '[' in response and ']' in response:
-                start = response.find('[')
-                end = response.rfind(']') + 1
-                json_str = response[start:end]
-                return json.loads(json_str)
+            parsed = extract_json_array(response)
+            if parsed is not None:
+                return parsed
         except:
             pass
         
@@ -461,11 +530,9 @@ class TaskReviewer:
         """从响应中提取补充计划"""
         try:
             # 尝试解析JSON
-            if '[' in response and ']' in response:
-                start = response.find('[')
-                end = response.rfind(']') + 1
-                json_str = response[start:end]
-                return json.loads(json_str)
+            parsed = extract_json_array(response)
+            if parsed is not None:
+                return parsed
         except:
             pass
         
@@ -1,28 +1,52 @@
 import typer
-import yaml
 import os
-import inspect # 导入 inspect 模块
-
-from typing import Optional, List, Dict, Any
-
-from .agent.planner import Planner
-from .agent.executor import Executor
-from .agent.model_router import ModelRouter
-from .agent.agent import Agent as IntelliAgent
-from .config.model_config import ModelConfigManager
-from .config.search_config import SearchConfigManager
-from .models.ollama_client import OllamaClient
-from .models.gemini_client import GeminiClient
-from .models.deepseek_client import DeepSeekClient
-from .models.openai_client import OpenAIClient
-from .models.claude_client import ClaudeClient
+import logging
+import importlib
+import functools
+import json
+from collections import defaultdict, deque
+from itertools import islice
+from types import MappingProxyType
+
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
+
 from .ui.display import ui  # 导入现代化UI
 
+# 代理、配置与工具模块在用到它们的命令中按需导入，
+# 使 --help 等轻量命令无需加载整个代理框架
+if TYPE_CHECKING:
+    from .agent.planner import Planner
+    from .agent.executor import Executor
+    from .agent.model_router import ModelRouter
+    from .config.model_config import ReviewConfig
+
 app = typer.Typer()
 
+# 已解析的配置缓存：(文件签名, 配置, 复盘设置, 提供商索引)，文件未变化时直接复用，跳过校验和解析
+_CFG_CACHE = None
+
+@functools.lru_cache(maxsize=1)
+def _model_config_manager():
+    """进程内共享的模型配置管理器（管理器每次操作都直接读写配置文件，可安全复用）"""
+    from .config.model_config import ModelConfigManager
+    return ModelConfigManager()
+
+@functools.lru_cache(maxsize=1)
+def _search_config_manager():
+    """进程内共享的搜索配置管理器"""
+    from .config.search_config import SearchConfigManager
+    return SearchConfigManager()
+
 def load_config():
     """从 config.yaml 加载配置，如果不存在则运行配置向导。"""
-    config_manager = ModelConfigManager()
+    global _CFG_CACHE
+    from .config.model_config import ReviewConfig, config_signature, load_yaml_config
+    
+    signature = config_signature("config.yaml")
+    if _CFG_CACHE is not None and signature is not None and _CFG_CACHE[0] == signature:
+        return _CFG_CACHE[1]
+    
+    config_manager = _model_config_manager()
     
     # 检查是否有有效配置
     if not config_manager.has_valid_config():
@@ -43,9 +67,105 @@ def load_config():
         ui.print_error("❌ 配置文件验证失败")
         raise typer.Exit(code=1)
     
-    # 加载配置
-    with open("config.yaml", 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
+    # 加载配置（校验时已解析过的内容直接复用）
+    config = load_yaml_config("config.yaml")
+    
+    _CFG_CACHE = (
+        config_signature("config.yaml"),
+        config,
+        ReviewConfig.from_config(config),
+        _build_provider_index(config)
+    )
+    return config
+
+def _build_provider_index(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """按别名索引模型提供商配置，别名重复时保留第一个"""
+    index = {}
+    for model_info in config.get('models', {}).get('providers', []):
+        index.setdefault(model_info.get('alias'), model_info)
+    return index
+
+def get_provider_index(config: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """返回别名 -> 提供商配置的索引，load_config 加载的配置直接复用已建好的索引"""
+    if _CFG_CACHE is not None and _CFG_CACHE[1] is config:
+        return _CFG_CACHE[3]
+    return _build_provider_index(config)
+
+def get_review_config(config: Dict[str, Any]) -> "ReviewConfig":
+    """返回配置中解析好的复盘设置，load_config 加载的配置直接复用已解析的结果"""
+    if _CFG_CACHE is not None and _CFG_CACHE[1] is config:
+        return _CFG_CACHE[2]
+    from .config.model_config import ReviewConfig
+    return ReviewConfig.from_config(config)
+
+def configure_logging(config: dict):
+    """按配置的 logging.level 设置 intellicli 日志，日志以纯文本输出到终端，不影响第三方库的日志。"""
+    level_name = str(config.get('logging', {}).get('level', 'INFO')).upper()
+    logger = logging.getLogger('intellicli')
+    logger.setLevel(getattr(logging, level_name, logging.INFO))
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.propagate = False
+
+# 模型提供商 -> (客户端模块, 类名)，仅在配置中实际使用时才导入对应 SDK
+_PROVIDER_MODULES = {
+    'ollama': ('.models.ollama_client', 'OllamaClient'),
+    'gemini': ('.models.gemini_client', 'GeminiClient'),
+    'openai': ('.models.openai_client', 'OpenAIClient'),
+    'deepseek': ('.models.deepseek_client', 'DeepSeekClient'),
+    'claude': ('.models.claude_client', 'ClaudeClient'),
+}
+_PROVIDER_CLASSES = {}
+
+def _provider_class(provider: str):
+    """按需导入并返回模型提供商的客户端类"""
+    client_class = _PROVIDER_CLASSES.get(provider)
+    if client_class is None:
+        module_name, class_name = _PROVIDER_MODULES[provider]
+        client_class = getattr(importlib.import_module(module_name, __package__), class_name)
+        _PROVIDER_CLASSES[provider] = client_class
+    return client_class
+
+# 模型提供商 -> 客户端构造函数（构造时才导入对应 SDK）
+_PROVIDER_BUILDERS = {
+    'ollama': lambda m: _provider_class('ollama')(
+        model_name=m['model_name'],
+        base_url=m.get('base_url', 'http://localhost:11434')
+    ),
+    'gemini': lambda m: _provider_class('gemini')(
+        model_name=m['model_name'],
+        api_key=m.get('api_key')
+    ),
+    'openai': lambda m: _provider_class('openai')(
+        model_name=m['model_name'],
+        api_key=m.get('api_key'),
+        base_url=m.get('base_url')
+    ),
+    'deepseek': lambda m: _provider_class('deepseek')(
+        model_name=m['model_name'],
+        api_key=m.get('api_key'),
+        base_url=m.get('base_url', 'https://api.deepseek.com')
+    ),
+    'claude': lambda m: _provider_class('claude')(
+        model_name=m['model_name'],
+        api_key=m.get('api_key')
+    ),
+}
+
+# 已构造的模型客户端：规范化的提供商配置 -> 客户端实例。
+# 回调中初始化的客户端在同一进程的 task/review/history 等命令中直接复用
+_MODEL_CLIENT_CACHE = {}
+
+def _build_model_client(builder, model_info: Dict[str, Any]):
+    """构造模型客户端，相同的提供商配置复用已构造的实例"""
+    key = json.dumps(model_info, sort_keys=True, default=str)
+    client = _MODEL_CLIENT_CACHE.get(key)
+    if client is None:
+        client = builder(model_info)
+        _MODEL_CLIENT_CACHE[key] = client
+    return client
 
 def get_model_clients(config: dict) -> Dict[str, Any]:
     """根据配置初始化所有模型客户端。"""
@@ -54,39 +174,13 @@ def get_model_clients(config: dict) -> Dict[str, Any]:
     
     for model_info in model_providers:
         alias = model_info['alias']
+        builder = _PROVIDER_BUILDERS.get(model_info['provider'])
+        if builder is None:
+            ui.print_warning(f"不支持的模型提供商: {model_info['provider']}")
+            continue
+        
         try:
-            if model_info['provider'] == 'ollama':
-                client = OllamaClient(
-                    model_name=model_info['model_name'],
-                    base_url=model_info.get('base_url', 'http://localhost:11434')
-                )
-            elif model_info['provider'] == 'gemini':
-                client = GeminiClient(
-                    model_name=model_info['model_name'],
-                    api_key=model_info.get('api_key')
-                )
-            elif model_info['provider'] == 'openai':
-                client = OpenAIClient(
-                    model_name=model_info['model_name'],
-                    api_key=model_info.get('api_key'),
-                    base_url=model_info.get('base_url')
-                )
-            elif model_info['provider'] == 'deepseek':
-                client = DeepSeekClient(
-                    model_name=model_info['model_name'],
-                    api_key=model_info.get('api_key'),
-                    base_url=model_info.get('base_url', 'https://api.deepseek.com')
-                )
-            elif model_info['provider'] == 'claude':
-                client = ClaudeClient(
-                    model_name=model_info['model_name'],
-                    api_key=model_info.get('api_key')
-                )
-            else:
-                ui.print_warning(f"不支持的模型提供商: {model_info['provider']}")
-                continue
-            
-            model_clients[alias] = client
+            model_clients[alias] = _build_model_client(builder, model_info)
             ui.print_info(f"✅ 已初始化模型: {alias} ({model_info['model_name']})")
         except Exception as e:
             ui.print_error(f"❌ 初始化模型 {alias} 失败: {e}")
@@ -96,105 +190,194 @@ def get_model_clients(config: dict) -> Dict[str, Any]:
 def get_model_client(config: dict):
     """根据配置初始化并返回主模型客户端。"""
     primary_model_alias = config['models']['primary']
-    model_providers = config['models']['providers']
-    
-    model_info = next((p for p in model_providers if p['alias'] == primary_model_alias), None)
+    model_info = get_provider_index(config).get(primary_model_alias)
     
     if not model_info:
         raise ValueError(f"配置中未找到主模型 '{primary_model_alias}'。")
 
-    if model_info['provider'] == 'ollama':
-        return OllamaClient(
-            model_name=model_info['model_name'],
-            base_url=model_info.get('base_url')  # 如果存在，则传递 base_url
-        )
-    elif model_info['provider'] == 'gemini':
-        return GeminiClient(
-            model_name=model_info['model_name'],
-            api_key=model_info.get('api_key')
-        )
-    elif model_info['provider'] == 'openai':
-        return OpenAIClient(
-            model_name=model_info['model_name'],
-            api_key=model_info.get('api_key'),
-            base_url=model_info.get('base_url')
-        )
-    elif model_info['provider'] == 'deepseek':
-        return DeepSeekClient(
-            model_name=model_info['model_name'],
-            api_key=model_info.get('api_key'),
-            base_url=model_info.get('base_url', 'https://api.deepseek.com')
-        )
-    elif model_info['provider'] == 'claude':
-        return ClaudeClient(
-            model_name=model_info['model_name'],
-            api_key=model_info.get('api_key')
-        )
-    else:
+    builder = _PROVIDER_BUILDERS.get(model_info['provider'])
+    if builder is None:
         raise ValueError(f"不支持的模型提供商: {model_info['provider']}")
+    return _build_model_client(builder, model_info)
+
+def _new_session_memory() -> Dict[str, Any]:
+    """创建空的会话记忆，各记录有长度上限，超出时自动丢弃最早的条目"""
+    return {
+        "created_files": deque(maxlen=200),
+        "visited_directories": deque(maxlen=200),
+        "last_operations": deque(maxlen=10),
+        "project_context": ""
+    }
+
+def _tail(items: deque, n: int) -> List[Any]:
+    """按原顺序返回 deque 的最后 n 项"""
+    return list(islice(reversed(items), n))[::-1]
+
+def _plan_fingerprint(plan: List[Dict[str, Any]]) -> tuple:
+    """计算计划指纹：每个步骤的工具名和规范化参数，用于快速判断计划是否重复"""
+    from .agent.executor import canonical_json
+    return tuple((step.get('tool'), canonical_json(step.get('arguments', {}))) for step in plan)
+
+# 复盘结果缺少某一部分时使用的共享只读默认值
+_EMPTY_SECTION = MappingProxyType({})
+_EMPTY_ITEMS = ()
+
+# 参数值以这些扩展名结尾时视为图像路径
+_IMG_EXTS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+# 判断扩展名只需参数值末尾的这几个字符（最长扩展名的长度）
+_IMG_EXT_TAIL = max(map(len, _IMG_EXTS))
+
+def _image_path(value: str) -> Optional[str]:
+    """参数值是图像路径或 URL 时返回去掉查询串和片段后的路径，否则返回 None"""
+    path = value.split('#', 1)[0].split('?', 1)[0]
+    return path if path[-_IMG_EXT_TAIL:].lower().endswith(_IMG_EXTS) else None
+
+# 工具名称 -> 模型路由时附加的任务类别描述
+_TOOL_CATEGORY = {
+    "integrate_content": " - 内容处理和整合任务",
+    "summarize_content": " - 内容处理和整合任务",
+    "extract_information": " - 内容处理和整合任务",
+    "analyze_image": " - 图像分析和视觉任务",
+    "describe_image": " - 图像分析和视觉任务",
+    "identify_objects_in_image": " - 图像分析和视觉任务",
+    "analyze_code_quality": " - 代码分析和编程任务",
+    "find_security_issues": " - 代码分析和编程任务",
+    "analyze_project_structure": " - 代码分析和编程任务",
+    "web_search": " - 网络搜索和信息检索任务",
+    "search_news": " - 网络搜索和信息检索任务",
+    "search_academic": " - 网络搜索和信息检索任务",
+    "generate_project_readme": " - 文档生成和技术写作任务",
+    "extract_api_documentation": " - 文档生成和技术写作任务",
+}
+
+# 内容整合工具与图像处理工具执行前需要注入模型客户端
+_CONTENT_MODEL_TOOLS = frozenset({
+    "integrate_content", "summarize_content", "extract_information", "transform_format"
+})
+_IMAGE_MODEL_TOOLS = frozenset({
+    "analyze_image", "describe_image", "identify_objects_in_image", "extract_text_from_image"
+})
+_MODEL_DEPENDENT_TOOLS = _CONTENT_MODEL_TOOLS | _IMAGE_MODEL_TOOLS | frozenset({
+    "generate_project_readme", "extract_api_documentation"
+})
+
+# 工具类别 -> 提供 set_model_client 的工具模块；解析后的函数缓存在 _SET_CLIENT_FNS
+_SET_CLIENT_MODULES = {
+    'content': '.tools.content_integrator',
+    'image': '.tools.image_processor',
+}
+_SET_CLIENT_FNS = {}
+
+# 工具名称 -> 需要注入模型客户端的工具类别
+_MODEL_CLIENT_CATEGORY = {
+    **dict.fromkeys(_CONTENT_MODEL_TOOLS, 'content'),
+    **dict.fromkeys(_IMAGE_MODEL_TOOLS, 'image'),
+}
+
+def _model_client_setter(category: str):
+    """返回工具类别对应的 set_model_client 函数，模块不可用时返回 None"""
+    if category not in _SET_CLIENT_FNS:
+        try:
+            module = importlib.import_module(_SET_CLIENT_MODULES[category], __package__)
+            _SET_CLIENT_FNS[category] = module.set_model_client
+        except ImportError:
+            _SET_CLIENT_FNS[category] = None
+    return _SET_CLIENT_FNS[category]
+
+# 成功执行后记录到会话记忆中“最近访问的目录”的工具
+_DIR_TOOLS = frozenset({'list_directory', 'start_http_server'})
+
+# 存在历史执行记录时附加的重新规划提示
+_RETRY_HINT = "**重要提示：根据历史上下文中的失败信息，生成一个全新的、不同的计划。避免重复相同的失败步骤。**"
+
+# 附加在每个规划提示末尾的任务理解指南
+_PLANNING_GUIDE = """**任务理解指南:**
+- 如果目标涉及"运行"、"打开"HTML文件，使用 open_file 工具打开文件
+- 如果需要启动Web服务器来运行HTML项目，使用 start_http_server 工具
+- 如果目标涉及创建文件后立即使用，考虑文件的具体用途
+- 充分利用会话上下文中的信息，理解任务的连续性
+
+请根据当前目标、会话上下文和历史记录，生成一个详细的、可执行的步骤列表。
+
+**您的响应必须仅是 JSON 数组。**"""
 
 class Agent:
     """
     Agent 类协调 Planner 和 Executor，实现动态任务规划和自动纠错。
     """
-    def __init__(self, model_router: ModelRouter, planner: Planner, executor: Executor):
+    def __init__(self, model_router: 'ModelRouter', planner: 'Planner', executor: 'Executor',
+                 config: Optional[Dict[str, Any]] = None):
         self.model_router = model_router
         self.planner = planner
         self.executor = executor
-        self.context = [] # 用于存储执行历史和结果，作为 Planner 的输入
+        # 启动时加载的配置，会话内复用；未提供时按需重新加载
+        self.config = config
         self.max_context_length = 5 # 最多保留最近的 N 个上下文条目
+        # 用于存储执行历史和结果，作为 Planner 的输入；超出上限时丢弃最早的条目
+        self.context = deque(maxlen=self.max_context_length)
+        # 与 context 逐项对应的计划指纹，不含计划的条目记为 None
+        self._context_plan_fps = deque(maxlen=self.max_context_length)
         self.current_goal = None
         self.task_active = False
-        self.session_memory = {  # 会话记忆
-            "created_files": [],
-            "visited_directories": [],
-            "last_operations": [],
-            "project_context": ""
-        }
-        # 任务执行历史（用于复盘功能）
-        self.execution_history = []
-        
-        # 获取主模型客户端，用于规划阶段
-        self.primary_model_client = self._get_primary_model_client()
-
-    def _get_primary_model_client(self):
-        """获取主模型客户端"""
-        # 从配置中获取主模型
-        primary_model = self.model_router.config.get('models', {}).get('primary')
-        if primary_model:
-            return self.model_router.get_model_client(primary_model)
-        
-        # 如果没有配置主模型，返回第一个可用模型
-        available_models = list(self.model_router.model_clients.keys())
-        if available_models:
-            return self.model_router.get_model_client(available_models[0])
-        
-        return None
+        self.session_memory = _new_session_memory()  # 会话记忆
+        # 与会话记忆中的文件/目录记录同步的集合，用于 O(1) 去重
+        self._created_files_set = set()
+        self._visited_dirs_set = set()
+        # 任务执行历史（用于复盘功能），只保留最近的20条
+        self.execution_history = deque(maxlen=20)
+        
+        # 复盘器在首次复盘时创建，会话内复用（连同其响应缓存）
+        self._task_reviewer = None
+
+    @functools.cached_property
+    def primary_model_client(self):
+        """主模型客户端，用于规划阶段；首次使用时才解析"""
+        return self.model_router.get_primary_model_client()
+
+    def _get_task_reviewer(self, review_config: "ReviewConfig"):
+        """获取会话内复用的任务复盘器"""
+        if self._task_reviewer is None:
+            from .agent.task_reviewer import TaskReviewer
+            self._task_reviewer = TaskReviewer(
+                self.primary_model_client,
+                response_cache_path=review_config.response_cache_path
+            )
+        return self._task_reviewer
 
     def _update_session_memory(self, plan: List[Dict[str, Any]], results: List[Dict[str, Any]]):
         """更新会话记忆"""
-        for i, (step, result) in enumerate(zip(plan, results)):
-            if result['status'] == 'completed':
-                tool_name = step.get('tool')
-                args = step.get('arguments', {})
-                
-                # 记录文件操作
-                if tool_name == 'write_file' and 'path' in args:
-                    file_path = args['path']
-                    if file_path not in self.session_memory["created_files"]:
-                        self.session_memory["created_files"].append(file_path)
-                
-                # 记录目录访问
-                elif tool_name in ['list_directory', 'start_http_server'] and 'path' in args:
-                    dir_path = args.get('path') or args.get('directory')
-                    if dir_path and dir_path not in self.session_memory["visited_directories"]:
-                        self.session_memory["visited_directories"].append(dir_path)
-                
-                # 记录最近操作
-                operation = f"{tool_name}: {args}"
-                self.session_memory["last_operations"].append(operation)
-                if len(self.session_memory["last_operations"]) > 10:
-                    self.session_memory["last_operations"].pop(0)
+        last_operations = self.session_memory["last_operations"]
+        completed_steps = [step for step, result in zip(plan, results) if result['status'] == 'completed']
+        
+        for step in completed_steps:
+            tool_name = step.get('tool')
+            args = step.get('arguments', {})
+            path = args.get('path')
+            
+            # 记录文件操作
+            if tool_name == 'write_file':
+                if path is not None:
+                    self._remember_unique("created_files", self._created_files_set, path)
+            
+            # 记录目录访问
+            elif tool_name in _DIR_TOOLS and 'path' in args:
+                dir_path = path or args.get('directory')
+                if dir_path:
+                    self._remember_unique("visited_directories", self._visited_dirs_set, dir_path)
+        
+        # 记录最近操作：超出 deque 上限的较早操作会被立即淘汰，只格式化最后保留的部分
+        for step in completed_steps[-last_operations.maxlen:]:
+            last_operations.append(f"{step.get('tool')}: {step.get('arguments', {})}")
+
+    def _remember_unique(self, key: str, seen: set, value: str):
+        """向会话记忆中追加未出现过的值，deque 淘汰最早条目时同步更新集合"""
+        if value in seen:
+            return
+        records = self.session_memory[key]
+        if len(records) == records.maxlen:
+            seen.discard(records[0])
+        records.append(value)
+        seen.add(value)
 
     def _generate_context_prompt(self, goal: str) -> str:
         """生成包含丰富上下文信息的提示"""
@@ -202,40 +385,30 @@ class Agent:
         
         # 添加会话记忆信息
         if self.session_memory["created_files"]:
-            context_info.append(f"最近创建的文件: {', '.join(self.session_memory['created_files'][-3:])}")
+            context_info.append(f"最近创建的文件: {', '.join(_tail(self.session_memory['created_files'], 3))}")
         
         if self.session_memory["visited_directories"]:
-            context_info.append(f"最近访问的目录: {', '.join(self.session_memory['visited_directories'][-3:])}")
+            context_info.append(f"最近访问的目录: {', '.join(_tail(self.session_memory['visited_directories'], 3))}")
         
         if self.session_memory["last_operations"]:
-            context_info.append(f"最近的操作: {'; '.join(self.session_memory['last_operations'][-3:])}")
+            context_info.append(f"最近的操作: {'; '.join(_tail(self.session_memory['last_operations'], 3))}")
         
-        # 构建基础提示
-        base_prompt = f"当前目标: {goal}"
+        # 构建基础提示，各部分之间以空行分隔
+        parts = [f"当前目标: {goal}"]
         
         if context_info:
-            base_prompt += f"\n\n会话上下文:\n" + "\n".join(f"- {info}" for info in context_info)
+            parts.append("会话上下文:\n" + "\n".join(f"- {info}" for info in context_info))
         
         # 添加失败历史
-        context_for_planner = self.context[-self.max_context_length:]
+        context_for_planner = _tail(self.context, self.max_context_length)
         if context_for_planner:
-            base_prompt += f"\n\n历史执行记录: {context_for_planner}"
-            base_prompt += "\n\n**重要提示：根据历史上下文中的失败信息，生成一个全新的、不同的计划。避免重复相同的失败步骤。**"
+            parts.append(f"历史执行记录: {context_for_planner}")
+            parts.append(_RETRY_HINT)
         
         # 添加智能建议
-        base_prompt += f"""
-
-**任务理解指南:**
-- 如果目标涉及"运行"、"打开"HTML文件，使用 open_file 工具打开文件
-- 如果需要启动Web服务器来运行HTML项目，使用 start_http_server 工具
-- 如果目标涉及创建文件后立即使用，考虑文件的具体用途
-- 充分利用会话上下文中的信息，理解任务的连续性
-
-请根据当前目标、会话上下文和历史记录，生成一个详细的、可执行的步骤列表。
-
-**您的响应必须仅是 JSON 数组。**"""
+        parts.append(_PLANNING_GUIDE)
         
-        return base_prompt
+        return "\n\n".join(parts)
 
     def _run_task_iteration(self, goal: str, max_planning_attempts: int = 5) -> bool:
         """
@@ -245,6 +418,15 @@ class Agent:
         current_plan = []
         all_completed_steps = []  # 累积所有成功的步骤
         
+        # 确保规划器使用主模型
+        if not self.primary_model_client:
+            ui.print_error("无法获取主模型客户端")
+            return False
+        self.planner.model_client = self.primary_model_client
+        
+        # 获取规划器可用的工具列表，包含详细的参数信息（一次任务内不变）
+        available_tools = self.executor.get_tool_info()
+        
         for p_attempt in range(max_planning_attempts):
             # 使用现代化UI显示规划尝试
             ui.print_planning_attempt(p_attempt + 1, max_planning_attempts)
@@ -253,31 +435,14 @@ class Agent:
                 # 首次规划：使用完整规划
                 ui.print_info(f"🧠 规划阶段: 使用主模型进行整体思考规划")
                 
-                # 确保规划器使用主模型
-                if self.primary_model_client:
-                    self.planner.model_client = self.primary_model_client
-                else:
-                    ui.print_error("无法获取主模型客户端")
-                    return False
-                
                 # 生成智能化的规划提示
                 planning_prompt = self._generate_context_prompt(goal)
 
-                # 获取规划器可用的工具列表，包含详细的参数信息
-                available_tools = self.executor.get_tool_info()
-
-                current_plan = self.planner.create_plan(planning_prompt, available_tools)
+                current_plan = self.planner.create_plan(planning_prompt, available_tools, cache_key=goal)
             else:
                 # 续接规划：从失败位置继续
                 ui.print_info(f"🔄 续接规划: 从失败位置继续，保留已完成的 {len(all_completed_steps)} 个步骤")
                 
-                # 确保规划器使用主模型
-                if self.primary_model_client:
-                    self.planner.model_client = self.primary_model_client
-                else:
-                    ui.print_error("无法获取主模型客户端")
-                    return False
-                
                 # 从上下文中获取失败步骤信息
                 failed_steps = []
                 if self.context:
@@ -288,9 +453,6 @@ class Agent:
                 # 生成智能化的规划提示
                 planning_prompt = self._generate_context_prompt(goal)
 
-                # 获取规划器可用的工具列表，包含详细的参数信息
-                available_tools = self.executor.get_tool_info()
-
                 # 使用续接规划
                 current_plan = self.planner.create_continuation_plan(
                     original_goal=planning_prompt,
@@ -303,8 +465,9 @@ class Agent:
                 ui.print_error("规划器未能生成有效计划。重试规划...")
                 continue
             
-            # 检查是否生成了与之前相同的计划
-            if self._is_duplicate_plan(current_plan):
+            # 检查是否生成了与之前相同的计划（指纹只计算一次，执行后随上下文保存）
+            plan_fp = _plan_fingerprint(current_plan)
+            if self._is_duplicate_plan(current_plan, plan_fp):
                 ui.print_warning("检测到重复计划，尝试生成新的计划...")
                 continue
             
@@ -334,12 +497,12 @@ class Agent:
                 self._update_session_memory(current_plan, all_current_results)
                 
                 # 更新上下文
-                self.context.append({
+                self._append_context({
                     "plan": current_plan, 
                     "results": execution_results,
                     "all_completed_steps": all_completed_steps,
                     "current_attempt": p_attempt + 1
-                })
+                }, plan_fp)
                 
                 # 显示执行摘要
                 total_steps_executed = len(execution_results)
@@ -354,6 +517,10 @@ class Agent:
                     # 当前批次全部成功完成
                     ui.print_success("🎉 任务成功完成！")
                     
+                    # 一次性完整成功的计划可作为相似目标的规划模板
+                    if len(all_completed_steps) == len(current_completed_steps):
+                        self.planner.record_successful_plan(goal, current_plan)
+                    
                     # 记录成功完成的任务到历史中（包含所有步骤）
                     final_plan = []
                     for i, step in enumerate(all_completed_steps, 1):
@@ -368,7 +535,7 @@ class Agent:
                 else:
                     ui.print_info(f"⚠️  当前批次有 {len(current_failed_steps)} 个步骤失败，尝试续接规划...")
                     # 将失败信息添加到上下文，以便规划器可以学习
-                    self.context.append({
+                    self._append_context({
                         "failed_steps": current_failed_steps, 
                         "attempt": p_attempt + 1,
                         "completed_so_far": len(all_completed_steps)
@@ -435,6 +602,8 @@ class Agent:
         
         results = []
         total_steps = len(plan)
+        # 当前批次最后一个成功步骤的输出，每步成功后就地更新
+        last_successful_output = None
         
         for task in plan:
             tool_name = task.get("tool")
@@ -445,14 +614,14 @@ class Agent:
             selected_model = self._select_model_for_task(task, goal)
             
             ui.print_info(f"🤖 步骤 {step_num}: 使用模型 [{selected_model}] 执行 {tool_name}")
+            self.executor.invalidate_speculation(tool_name)
             
             # 处理占位符
             try:
                 last_output = ""
                 if results:
-                    last_successful = [r for r in results if r['status'] == 'completed']
-                    if last_successful:
-                        last_output = str(last_successful[-1]['output'])
+                    if last_successful_output is not None:
+                        last_output = last_successful_output
                     elif initial_output:
                         # 如果当前批次没有成功步骤，使用初始输出
                         last_output = initial_output
@@ -475,11 +644,12 @@ class Agent:
             
             # 执行工具，传入选定的模型客户端
             selected_model_client = self.model_router.get_model_client(selected_model)
-            result = self._execute_single_step(task, processed_arguments, step_num, selected_model_client)
+            result = self._execute_single_step(task, processed_arguments, step_num, selected_model_client, len(results))
             
             # 显示执行结果
             if result['status'] == 'completed':
-                ui.print_step_result(str(result['output']))
+                last_successful_output = str(result['output'])
+                ui.print_step_result(last_successful_output)
                 ui.print_step_execution(step_num, total_steps, tool_name, "success")
             else:
                 ui.print_step_result(result['error'], is_error=True)
@@ -487,6 +657,9 @@ class Agent:
             
             results.append(result)
         
+        # 未被采用的预执行结果不再有效
+        self.executor.discard_speculation()
+        
         return results
 
     def _select_model_for_task(self, task: Dict[str, Any], goal: str) -> str:
@@ -494,32 +667,22 @@ class Agent:
         tool_name = task.get("tool")
         arguments = task.get("arguments", {})
         
-        # 构建步骤描述用于模型选择
-        step_description = f"执行工具 {tool_name}"
-        
-        # 根据工具类型和参数增强描述
-        if tool_name in ["integrate_content", "summarize_content", "extract_information"]:
-            step_description += " - 内容处理和整合任务"
-        elif tool_name in ["analyze_image", "describe_image", "identify_objects_in_image"]:
-            step_description += " - 图像分析和视觉任务"
-        elif tool_name in ["analyze_code_quality", "find_security_issues", "analyze_project_structure"]:
-            step_description += " - 代码分析和编程任务"
-        elif tool_name in ["web_search", "search_news", "search_academic"]:
-            step_description += " - 网络搜索和信息检索任务"
-        elif tool_name in ["generate_project_readme", "extract_api_documentation"]:
-            step_description += " - 文档生成和技术写作任务"
+        # 构建步骤描述用于模型选择，并根据工具类型增强描述
+        step_description = f"执行工具 {tool_name}" + _TOOL_CATEGORY.get(tool_name, "")
         
         # 检查参数中是否包含图像路径
         task_context = {"file_paths": []}
-        for key, value in arguments.items():
-            if isinstance(value, str) and any(ext in value.lower() for ext in ['.png', '.jpg', '.jpeg', '.gif', '.bmp']):
-                task_context["file_paths"].append(value)
+        for value in arguments.values():
+            image_path = _image_path(value) if isinstance(value, str) else None
+            if image_path:
+                task_context["file_paths"].append(image_path)
         
         # 使用模型路由器选择专业模型
         return self.model_router.route_task(step_description, task_context)
 
-    def _execute_single_step(self, task: Dict[str, Any], processed_arguments: Dict[str, Any], step_num: int, model_client) -> Dict[str, Any]:
-        """执行单个步骤，使用指定的模型客户端"""
+    def _execute_single_step(self, task: Dict[str, Any], processed_arguments: Dict[str, Any], step_num: int, model_client, plan_index: int = None) -> Dict[str, Any]:
+        """执行单个步骤，使用指定的模型客户端；`plan_index` 为步骤在计划中的位置，用于复用预执行结果"""
+        from .agent.executor import is_error_output
         tool_name = task.get("tool")
         
         result = {
@@ -537,11 +700,10 @@ class Agent:
                 
                 # 验证参数
                 if tool_name in self.executor.tool_info:
-                    expected_params = [p["name"] for p in self.executor.tool_info[tool_name]["parameters"]]
-                    provided_params = list(processed_arguments.keys())
-                    invalid_params = [p for p in provided_params if p not in expected_params]
+                    invalid_params = self.executor.find_invalid_params(tool_name, processed_arguments)
                     
                     if invalid_params:
+                        expected_params = self.executor.expected_param_names(tool_name)
                         error_message = f"工具 {tool_name} 收到无效参数: {invalid_params}。期望参数: {expected_params}"
                         result['error'] = error_message
                         return result
@@ -551,11 +713,15 @@ class Agent:
                     # 临时设置模型客户端
                     self._set_tool_model_client(tool_name, model_client)
                 
-                # 调用工具
-                output = tool_function(**processed_arguments)
+                # 调用工具（规划期间已预执行的只读步骤直接复用结果）
+                hit, output = False, None
+                if plan_index is not None:
+                    hit, output = self.executor.take_speculative_result(plan_index, tool_name, processed_arguments)
+                if not hit:
+                    output = tool_function(**processed_arguments)
                 
                 # 检查是否为错误输出
-                if isinstance(output, str) and ("出错" in output or "错误" in output or "Error" in output):
+                if is_error_output(output):
                     result['error'] = output
                 else:
                     result['status'] = 'completed'
@@ -580,10 +746,8 @@ class Agent:
                 result['error'] = error_message
         else:
             # 添加调试信息
-            available_builtin_tools = list(self.executor.tools.keys())
-            available_mcp_tools = []
             if self.executor.mcp_manager:
-                available_mcp_tools = list(self.executor.mcp_manager.all_tools.keys())
+                available_mcp_tools = list(self.executor.mcp_manager.all_tools)
                 print(f"  \\_ 调试: 可用 MCP 工具: {available_mcp_tools}")
             
             error_message = f"未找到工具 '{tool_name}'"
@@ -593,55 +757,34 @@ class Agent:
 
     def _tool_needs_model_client(self, tool_name: str) -> bool:
         """检查工具是否需要模型客户端"""
-        model_dependent_tools = [
-            "integrate_content", "summarize_content", "extract_information", 
-            "transform_format", "analyze_image", "describe_image", 
-            "identify_objects_in_image", "extract_text_from_image",
-            "generate_project_readme", "extract_api_documentation"
-        ]
-        return tool_name in model_dependent_tools
+        return tool_name in _MODEL_DEPENDENT_TOOLS
 
     def _set_tool_model_client(self, tool_name: str, model_client):
         """为特定工具设置模型客户端"""
-        if tool_name in ["integrate_content", "summarize_content", "extract_information", "transform_format"]:
-            # 设置内容整合工具的模型客户端
-            try:
-                from .tools.content_integrator import set_model_client
-                set_model_client(model_client)
-            except ImportError:
-                pass
-        elif tool_name in ["analyze_image", "describe_image", "identify_objects_in_image", "extract_text_from_image"]:
-            # 设置图像处理工具的模型客户端
-            try:
-                from .tools.image_processor import set_model_client
-                set_model_client(model_client)
-            except ImportError:
-                pass
+        # 内容整合与图像处理工具各自所在模块的 set_model_client
+        category = _MODEL_CLIENT_CATEGORY.get(tool_name)
+        if category is None:
+            return
+        set_model_client = _model_client_setter(category)
+        if set_model_client is not None:
+            set_model_client(model_client)
+
+    def _append_context(self, item: Dict[str, Any], plan_fp: Optional[tuple] = None):
+        """追加上下文条目，并记录其中计划的指纹（调用方已计算时直接传入）"""
+        self.context.append(item)
+        plan = item.get('plan')
+        if plan_fp is None and plan is not None:
+            plan_fp = _plan_fingerprint(plan)
+        self._context_plan_fps.append(plan_fp)
 
-    def _is_duplicate_plan(self, new_plan: List[Dict[str, Any]]) -> bool:
+    def _is_duplicate_plan(self, new_plan: List[Dict[str, Any]], new_fp: Optional[tuple] = None) -> bool:
         """检查新计划是否与之前的计划重复"""
         if not self.context:
             return False
         
-        for context_item in self.context[-3:]:
-            if 'plan' in context_item:
-                old_plan = context_item['plan']
-                if self._plans_are_similar(new_plan, old_plan):
-                    return True
-        return False
-
-    def _plans_are_similar(self, plan1: List[Dict[str, Any]], plan2: List[Dict[str, Any]]) -> bool:
-        """比较两个计划是否相似"""
-        if len(plan1) != len(plan2):
-            return False
-        
-        for i, (step1, step2) in enumerate(zip(plan1, plan2)):
-            if step1.get('tool') != step2.get('tool'):
-                return False
-            if step1.get('arguments') != step2.get('arguments'):
-                return False
-        
-        return True
+        if new_fp is None:
+            new_fp = _plan_fingerprint(new_plan)
+        return new_fp in islice(reversed(self._context_plan_fps), 3)
 
     def _record_task_to_history(self, goal: str, plan: List[Dict[str, Any]], results: List[Dict[str, Any]], success: bool):
         """记录任务到执行历史中（用于复盘功能）"""
@@ -664,24 +807,18 @@ class Agent:
         }
         
         self.execution_history.append(history_entry)
-        
-        # 限制历史记录数量，保留最近的20条
-        if len(self.execution_history) > 20:
-            self.execution_history = self.execution_history[-20:]
 
     def get_execution_history(self) -> List[Dict[str, Any]]:
         """获取执行历史（兼容复盘功能）"""
-        return self.execution_history
+        return list(self.execution_history)
 
     def clear_session_memory(self):
         """清空会话记忆"""
-        self.session_memory = {
-            "created_files": [],
-            "visited_directories": [],
-            "last_operations": [],
-            "project_context": ""
-        }
-        self.context = []
+        self.session_memory = _new_session_memory()
+        self._created_files_set.clear()
+        self._visited_dirs_set.clear()
+        self.context.clear()
+        self._context_plan_fps.clear()
         ui.print_success("会话记忆已清空")
 
     def show_model_info(self):
@@ -696,11 +833,11 @@ class Agent:
     def _handle_review_command(self):
         """处理session模式下的review命令"""
         try:
-            config = load_config()
+            config = self.config if self.config is not None else load_config()
             
             # 检查复盘功能是否启用
-            review_config = config.get('task_review', {})
-            if not review_config.get('enabled', False):
+            review_config = get_review_config(config)
+            if not review_config.enabled:
                 ui.print_review_disabled()
                 return
             
@@ -709,9 +846,6 @@ class Agent:
                 ui.print_warning("没有可复盘的任务历史")
                 return
             
-            # 初始化模型客户端
-            primary_client = get_model_client(config)
-            
             # 使用当前Agent的历史记录进行复盘
             ui.print_info("🔍 开始复盘最近的任务")
             
@@ -723,9 +857,8 @@ class Agent:
             
             ui.print_info(f"复盘目标: {goal}")
             
-            # 创建任务复盘器进行分析
-            from .agent.task_reviewer import TaskReviewer
-            task_reviewer = TaskReviewer(primary_client)
+            # 使用任务复盘器进行分析
+            task_reviewer = self._get_task_reviewer(review_config)
             
             review_result = task_reviewer.review_task_execution(
                 original_goal=goal,
@@ -755,57 +888,56 @@ class Agent:
 
     def _display_review_results(self, review_result: Dict[str, Any]):
         """显示复盘结果"""
-        overall_assessment = review_result.get('overall_assessment', {})
-        
-        ui.print_info(f"📊 整体评分: {overall_assessment.get('overall_score', 0)}/100")
-        ui.print_info(f"🏆 评级: {overall_assessment.get('grade', '未知')}")
-        ui.print_info(f"📝 总结: {overall_assessment.get('summary', '无')}")
-        
+        overall_assessment = review_result.get('overall_assessment', _EMPTY_SECTION)
         # 显示目标达成情况
-        goal_achievement = review_result.get('goal_achievement', {})
-        ui.print_info(f"🎯 目标达成度: {goal_achievement.get('achievement_percentage', 0)}%")
+        goal_achievement = review_result.get('goal_achievement', _EMPTY_SECTION)
+        
+        ui.print_info_lines((
+            f"📊 整体评分: {overall_assessment.get('overall_score', 0)}/100",
+            f"🏆 评级: {overall_assessment.get('grade', '未知')}",
+            f"📝 总结: {overall_assessment.get('summary', '无')}",
+            f"🎯 目标达成度: {goal_achievement.get('achievement_percentage', 0)}%",
+        ))
         
         # 显示问题列表
-        issues = review_result.get('issues_identified', [])
+        issues = review_result.get('issues_identified', _EMPTY_ITEMS)
         if issues:
             ui.print_warning(f"⚠️ 发现 {len(issues)} 个问题:")
-            for issue in issues[:3]:  # 只显示前3个问题
-                ui.print_info(f"   - {issue.get('description', '未知问题')}")
+            # 只显示前3个问题
+            ui.print_info_lines([f"   - {issue.get('description', '未知问题')}" for issue in islice(issues, 3)])
         
         # 显示改进建议
-        suggestions = review_result.get('improvement_suggestions', [])
+        suggestions = review_result.get('improvement_suggestions', _EMPTY_ITEMS)
         if suggestions:
-            ui.print_info(f"💡 改进建议:")
-            for suggestion in suggestions[:3]:  # 只显示前3个建议
-                ui.print_info(f"   - {suggestion.get('suggestion', '无建议')}")
+            # 只显示前3个建议
+            ui.print_info_lines(["💡 改进建议:", *(f"   - {suggestion.get('suggestion', '无建议')}" for suggestion in islice(suggestions, 3))])
 
     def start_session(self):
         """启动一个持续的交互会话"""
         ui.print_welcome_message()
         
+        # 会话内置命令 -> 处理函数
+        commands = {
+            'help': ui.print_help,
+            'clear': self.clear_session_memory,
+            'models': self.show_model_info,
+            'review': self._handle_review_command,
+            'history': self._handle_history_command,
+        }
+        
         while True:
             user_input = ui.get_user_input()
             
             if not user_input:
                 continue
-                
-            if user_input.lower() == 'exit':
+            
+            command = user_input.lower()
+            if command == 'exit':
                 ui.print_info("👋 感谢使用 IntelliCLI！")
                 break
-            elif user_input.lower() == 'help':
-                ui.print_help()
-                continue
-            elif user_input.lower() == 'clear':
-                self.clear_session_memory()
-                continue
-            elif user_input.lower() == 'models':
-                self.show_model_info()
-                continue
-            elif user_input.lower() == 'review':
-                self._handle_review_command()
-                continue
-            elif user_input.lower() == 'history':
-                self._handle_history_command()
+            handler = commands.get(command)
+            if handler is not None:
+                handler()
                 continue
             
             if not self.task_active:
@@ -820,6 +952,24 @@ class Agent:
                 self.task_active = False
                 self.current_goal = None
 
+def cli_error_guard(message: str):
+    """
+    命令出错处理装饰器：打印错误信息并以退出码 1 结束。
+    命令主动抛出的 typer.Exit 原样向上传递。
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            try:
+                return fn(*args, **kwargs)
+            except typer.Exit:
+                raise
+            except Exception as e:
+                ui.print_error(f"{message}: {e}")
+                raise typer.Exit(code=1)
+        return wrapper
+    return decorator
+
 @app.command()
 def chat(prompt: str, ctx: typer.Context):
     """与指定模型开始聊天会话。"""
@@ -849,13 +999,15 @@ def task(
     config = ctx.obj["config"]
     
     # 检查是否启用复盘功能
-    review_config = config.get('task_review', {})
-    should_review = enable_review or review_config.get('auto_review', False)
+    review_config = get_review_config(config)
+    should_review = enable_review or review_config.auto_review
     
-    if should_review and review_config.get('enabled', False):
+    if should_review and review_config.enabled:
         # 使用新的智能代理执行任务（支持复盘）
         primary_client = get_model_client(config)
+        from .agent.agent import Agent as IntelliAgent
         intelli_agent = IntelliAgent(primary_client, config)
+        ctx.call_on_close(intelli_agent.close)
         
         ui.print_section_header("IntelliCLI 智能任务执行", "🤖")
         ui.print_info(f"🎯 目标: {prompt}")
@@ -920,56 +1072,117 @@ def models(ctx: typer.Context):
             ui.print_info(f"  - {issue}")
 
 @app.command()
+@cli_error_guard("显示配置时出错")
 def config():
     """显示当前模型配置"""
-    try:
-        config_manager = ModelConfigManager()
-        config_manager.show_current_config()
-    except Exception as e:
-        ui.print_error(f"显示配置时出错: {e}")
-        raise typer.Exit(code=1)
+    config_manager = _model_config_manager()
+    config_manager.show_current_config()
 
 @app.command()
+@cli_error_guard("运行配置向导时出错")
 def config_wizard():
     """运行模型配置向导"""
-    try:
-        config_manager = ModelConfigManager()
-        success = config_manager.run_config_wizard()
-        if success:
-            ui.print_success("✅ 配置向导完成！")
-        else:
-            ui.print_error("❌ 配置向导失败")
-            raise typer.Exit(code=1)
-    except Exception as e:
-        ui.print_error(f"运行配置向导时出错: {e}")
+    config_manager = _model_config_manager()
+    success = config_manager.run_config_wizard()
+    if success:
+        ui.print_success("✅ 配置向导完成！")
+    else:
+        ui.print_error("❌ 配置向导失败")
         raise typer.Exit(code=1)
 
 @app.command()
+@cli_error_guard("重置配置时出错")
 def config_reset():
     """重置模型配置"""
-    try:
-        config_manager = ModelConfigManager()
-        success = config_manager.reconfigure()
-        if success:
-            ui.print_success("✅ 配置重置完成！")
-        else:
-            ui.print_error("❌ 配置重置失败")
-            raise typer.Exit(code=1)
-    except Exception as e:
-        ui.print_error(f"重置配置时出错: {e}")
+    config_manager = _model_config_manager()
+    success = config_manager.reconfigure()
+    if success:
+        ui.print_success("✅ 配置重置完成！")
+    else:
+        ui.print_error("❌ 配置重置失败")
         raise typer.Exit(code=1)
 
+# 各平台按优先级尝试的编辑器命令，Linux 及其他平台共用 "linux" 一项
+_EDITORS_BY_PLATFORM = {
+    "darwin": (  # macOS
+        ("open", "-t"),  # 默认文本编辑器
+        ("code", "--wait"),  # VS Code
+        ("cursor", "--wait"),  # Cursor
+        ("nano",),
+        ("vim",),
+    ),
+    "windows": (  # Windows
+        ("notepad",),  # 记事本
+        ("code", "--wait"),  # VS Code
+        ("cursor", "--wait"),  # Cursor
+        ("nano",),
+        ("vim",),
+    ),
+    "linux": (  # Linux and others
+        ("code", "--wait"),  # VS Code
+        ("cursor", "--wait"),  # Cursor
+        ("gedit",),  # GNOME 文本编辑器
+        ("kate",),  # KDE 文本编辑器
+        ("nano",),
+        ("vim",),
+    ),
+}
+
+# 显示用的固定提示文本
+_CONFIG_EDIT_TIPS = (
+    "💡 提示：",
+    "   - 编辑完成后保存并关闭编辑器",
+    "   - 配置文件使用 YAML 格式",
+    "   - 注意保持正确的缩进（使用空格，不要使用制表符）",
+    "   - 修改后请运行 'intellicli config' 验证配置",
+    "",
+)
+
+_EDITOR_DOWNLOAD_HINTS = (
+    "   - VS Code: https://code.visualstudio.com/",
+    "   - Cursor: https://cursor.sh/",
+)
+
+_EDITOR_EXTRA_HINTS = {
+    "darwin": (),
+    "windows": ("   - 或使用记事本编辑",),
+    "linux": ("   - 或安装: sudo apt install gedit (Ubuntu)",),
+}
+
+_MCP_STATUS_TIPS = (
+    "",
+    "💡 提示:",
+    "   - 使用 'intellicli mcp-config' 配置新的 MCP 服务器",
+    "   - 使用 'intellicli task' 命令可以调用 MCP 工具",
+)
+
+_MCP_TOOLS_TIPS = (
+    "\n💡 提示:",
+    "   - 使用 'intellicli task \"<任务描述>\"' 来执行任务",
+    "   - AI 会自动选择合适的工具来完成任务",
+    "   - 可以在任务描述中明确指定使用某个工具",
+)
+
 @app.command(name="config-edit")
 def config_edit():
     """直接编辑配置文件"""
+    import shutil
     import subprocess
     import platform
+    import yaml
+    from .config.model_config import SafeDumper
     
     config_path = "config.yaml"
+    config_abs_path = os.path.abspath(config_path)
     
     try:
-        # 检查配置文件是否存在
-        if not os.path.exists(config_path):
+        # 检查配置文件是否存在：以独占模式创建，已存在时不会被覆盖
+        try:
+            config_file = open(config_path, 'x', encoding='utf-8')
+        except FileExistsError:
+            config_file = None
+        
+        if config_file is not None:
             ui.print_warning("⚠️ 配置文件不存在，正在创建示例配置文件...")
             
             # 创建示例配置文件
@@ -1012,8 +1225,8 @@ def config_edit():
                 }
             }
             
-            with open(config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(example_config, f, default_flow_style=False, allow_unicode=True, indent=2)
+            with config_file as f:
+                yaml.dump(example_config, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, indent=2)
             
             ui.print_success(f"✅ 已创建示例配置文件: {config_path}")
         
@@ -1021,41 +1234,10 @@ def config_edit():
         system = platform.system().lower()
         
         # 尝试不同的编辑器，按优先级排序
-        editors_to_try = []
-        
-        if system == "darwin":  # macOS
-            editors_to_try = [
-                ["open", "-t"],  # 默认文本编辑器
-                ["code", "--wait"],  # VS Code
-                ["cursor", "--wait"],  # Cursor
-                ["nano"],
-                ["vim"]
-            ]
-        elif system == "windows":  # Windows
-            editors_to_try = [
-                ["notepad"],  # 记事本
-                ["code", "--wait"],  # VS Code
-                ["cursor", "--wait"],  # Cursor
-                ["nano"],
-                ["vim"]
-            ]
-        else:  # Linux and others
-            editors_to_try = [
-                ["code", "--wait"],  # VS Code
-                ["cursor", "--wait"],  # Cursor
-                ["gedit"],  # GNOME 文本编辑器
-                ["kate"],  # KDE 文本编辑器
-                ["nano"],
-                ["vim"]
-            ]
+        editors_to_try = _EDITORS_BY_PLATFORM.get(system, _EDITORS_BY_PLATFORM["linux"])
         
         ui.print_info(f"🔧 正在打开配置文件进行编辑: {config_path}")
-        ui.print_info("💡 提示：")
-        ui.print_info("   - 编辑完成后保存并关闭编辑器")
-        ui.print_info("   - 配置文件使用 YAML 格式")
-        ui.print_info("   - 注意保持正确的缩进（使用空格，不要使用制表符）")
-        ui.print_info("   - 修改后请运行 'intellicli config' 验证配置")
-        ui.print_info("")
+        ui.print_info_lines(_CONFIG_EDIT_TIPS)
         
         editor_found = False
         
@@ -1067,14 +1249,14 @@ def config_edit():
                     subprocess.run([editor_cmd[0], config_path], check=True)
                 elif system == "darwin" and editor_cmd[0] == "open":
                     # macOS open 命令特殊处理
-                    subprocess.run(editor_cmd + [config_path], check=True)
+                    subprocess.run([*editor_cmd, config_path], check=True)
                 else:
-                    # 检查命令是否存在
-                    subprocess.run(["which", editor_cmd[0]], 
-                                 capture_output=True, check=True)
+                    # 检查命令是否存在（直接查找 PATH，无需启动 which 进程）
+                    if shutil.which(editor_cmd[0]) is None:
+                        continue
                     
                     # 启动编辑器
-                    subprocess.run(editor_cmd + [config_path], check=True)
+                    subprocess.run([*editor_cmd, config_path], check=True)
                 
                 editor_found = True
                 break
@@ -1086,20 +1268,10 @@ def config_edit():
             # 如果没有找到图形编辑器，给出手动编辑提示
             ui.print_warning("⚠️ 未找到可用的编辑器")
             ui.print_info("📝 您可以手动编辑配置文件:")
-            ui.print_info(f"   文件路径: {os.path.abspath(config_path)}")
+            ui.print_info(f"   文件路径: {config_abs_path}")
             ui.print_info("")
             ui.print_info("🔧 或者安装以下编辑器之一:")
-            if system == "darwin":
-                ui.print_info("   - VS Code: https://code.visualstudio.com/")
-                ui.print_info("   - Cursor: https://cursor.sh/")
-            elif system == "windows": 
-                ui.print_info("   - VS Code: https://code.visualstudio.com/")
-                ui.print_info("   - Cursor: https://cursor.sh/")
-                ui.print_info("   - 或使用记事本编辑")
-            else:
-                ui.print_info("   - VS Code: https://code.visualstudio.com/")
-                ui.print_info("   - Cursor: https://cursor.sh/")
-                ui.print_info("   - 或安装: sudo apt install gedit (Ubuntu)")
+            ui.print_info_lines(_EDITOR_DOWNLOAD_HINTS + _EDITOR_EXTRA_HINTS.get(system, _EDITOR_EXTRA_HINTS["linux"]))
             return
         
         ui.print_success("✅ 配置文件编辑完成！")
@@ -1111,430 +1283,446 @@ def config_edit():
         
     except Exception as e:
         ui.print_error(f"打开配置文件时出错: {e}")
-        ui.print_info(f"📝 您可以手动编辑配置文件: {os.path.abspath(config_path)}")
+        ui.print_info(f"📝 您可以手动编辑配置文件: {config_abs_path}")
         raise typer.Exit(code=1)
 
 @app.command(name="review-config")
+@cli_error_guard("配置复盘功能时出错")
 def review_config():
     """配置复盘功能"""
-    try:
-        config_manager = ModelConfigManager()
-        success = config_manager.configure_review_only()
-        if not success:
-            raise typer.Exit(code=1)
-    except Exception as e:
-        ui.print_error(f"配置复盘功能时出错: {e}")
+    config_manager = _model_config_manager()
+    success = config_manager.configure_review_only()
+    if not success:
         raise typer.Exit(code=1)
 
 @app.command(name="search-config")
+@cli_error_guard("配置搜索引擎时出错")
 def search_config():
     """配置搜索引擎"""
-    try:
-        search_config_manager = SearchConfigManager()
-        search_config_manager.run_config_wizard()
-    except Exception as e:
-        ui.print_error(f"配置搜索引擎时出错: {e}")
-        raise typer.Exit(code=1)
+    search_config_manager = _search_config_manager()
+    search_config_manager.run_config_wizard()
 
 @app.command(name="search-status")
+@cli_error_guard("显示搜索配置时出错")
 def search_status():
     """显示搜索引擎配置状态"""
-    try:
-        search_config_manager = SearchConfigManager()
-        search_config_manager.show_search_config()
-    except Exception as e:
-        ui.print_error(f"显示搜索配置时出错: {e}")
-        raise typer.Exit(code=1)
+    search_config_manager = _search_config_manager()
+    search_config_manager.show_search_config()
 
 @app.command()
 def search_test(
     query: str = typer.Option("Python 编程", help="测试搜索查询"),
     engine: str = typer.Option("auto", help="指定搜索引擎 (auto, google, bing, yahoo, duckduckgo, startpage, searx)"),
-    test_failover: bool = typer.Option(False, help="测试故障转移功能")
+    test_failover: bool = typer.Option(False, help="测试故障转移功能"),
+    verbose: bool = typer.Option(False, "--verbose", "-v", help="出错时显示完整的异常堆栈")
 ):
     """测试搜索引擎功能，包括智能切换"""
-    from .tools.web_search import web_search, get_available_engines, search_health
+    from .tools.web_search import web_search, get_available_engines, search_health as engine_health
     
-    print("🔍 搜索引擎功能测试")
-    print("=" * 50)
-    print(f"查询: {query}")
-    print(f"引擎: {engine}")
-    print(f"测试故障转移: {'是' if test_failover else '否'}")
+    # 各部分输出先收集成行，在搜索前后的阶段边界一次写出并刷新
+    lines = [
+        "🔍 搜索引擎功能测试",
+        "=" * 50,
+        f"查询: {query}",
+        f"引擎: {engine}",
+        f"测试故障转移: {'是' if test_failover else '否'}",
+    ]
     
     if test_failover:
-        print("\n🧪 故障转移测试模式")
-        print("将模拟部分引擎失败，测试自动切换功能...")
+        lines.append("\n🧪 故障转移测试模式")
+        lines.append("将模拟部分引擎失败，测试自动切换功能...")
         
         # 临时标记一些引擎为失败状态进行测试
         available_engines = get_available_engines()
         if len(available_engines) > 1:
             # 模拟第一个引擎失败
             test_engine = available_engines[0]
-            print(f"🔧 模拟 {test_engine} 引擎失败...")
-            search_health.record_failure(test_engine)
-            search_health.record_failure(test_engine)
-            search_health.record_failure(test_engine)  # 触发黑名单
+            lines.append(f"🔧 模拟 {test_engine} 引擎失败...")
+            engine_health.record_failure(test_engine)
+            engine_health.record_failure(test_engine)
+            engine_health.record_failure(test_engine)  # 触发黑名单
     
     try:
-        print(f"\n🚀 开始搜索...")
-        result = web_search(query, engine, max_results=3)
+        lines.append(f"\n🚀 开始搜索...")
+        print("\n".join(lines), flush=True)
         
-        if "error" in result:
-            print(f"❌ 搜索失败: {result['error']}")
-            if "search_info" in result:
-                search_info = result["search_info"]
-                print(f"尝试的引擎: {search_info.get('engines_tried', [])}")
-                print(f"总尝试次数: {search_info.get('total_attempts', 0)}")
-        else:
-            print(f"✅ 搜索成功!")
+        lines = []
+        try:
+            result = web_search(query, engine, max_results=3)
             
-            # 显示搜索信息
-            if "search_info" in result:
-                search_info = result["search_info"]
-                print(f"使用的引擎: {search_info['engine_used']}")
-                print(f"尝试次数: {search_info['attempt_number']}/{search_info['total_attempts']}")
-                if search_info.get('auto_switched'):
-                    print("🔄 发生了自动切换")
+            if "error" in result:
+                lines.append(f"❌ 搜索失败: {result['error']}")
+                if "search_info" in result:
+                    search_info = result["search_info"]
+                    lines.append(f"尝试的引擎: {search_info.get('engines_tried', [])}")
+                    lines.append(f"总尝试次数: {search_info.get('total_attempts', 0)}")
+            else:
+                lines.append(f"✅ 搜索成功!")
             
-            # 显示搜索结果
-            print(f"\n📋 搜索结果 (共 {result.get('total_results', 0)} 条):")
-            for i, item in enumerate(result.get("results", []), 1):
-                print(f"\n{i}. {item.get('title', 'N/A')}")
-                print(f"   链接: {item.get('url', 'N/A')}")
-                snippet = item.get('snippet', 'N/A')
-                if len(snippet) > 100:
-                    snippet = snippet[:100] + "..."
-                print(f"   摘要: {snippet}")
-        
-        # 显示当前健康状态
-        print(f"\n📊 当前引擎健康状态:")
-        available_engines = get_available_engines()
-        print(f"可用引擎: {', '.join(available_engines) if available_engines else '无'}")
-        
-        # 显示失败统计
-        if search_health.failure_counts:
-            print("失败统计:")
-            for engine, count in search_health.failure_counts.items():
-                if count > 0:
-                    print(f"  - {engine}: {count} 次")
+                # 显示搜索信息
+                if "search_info" in result:
+                    search_info = result["search_info"]
+                    lines.append(f"使用的引擎: {search_info['engine_used']}")
+                    lines.append(f"尝试次数: {search_info['attempt_number']}/{search_info['total_attempts']}")
+                    if search_info.get('auto_switched'):
+                        lines.append("🔄 发生了自动切换")
+            
+                # 显示搜索结果
+                lines.append(f"\n📋 搜索结果 (共 {result.get('total_results', 0)} 条):")
+                for i, item in enumerate(result.get("results", []), 1):
+                    lines.append(f"\n{i}. {item.get('title', 'N/A')}")
+                    lines.append(f"   链接: {item.get('url', 'N/A')}")
+                    snippet = item.get('snippet', 'N/A')
+                    if len(snippet) > 100:
+                        snippet = snippet[:100] + "..."
+                    lines.append(f"   摘要: {snippet}")
+        
+            # 显示当前健康状态
+            lines.append(f"\n📊 当前引擎健康状态:")
+            available_engines = get_available_engines()
+            lines.append(f"可用引擎: {', '.join(available_engines) if available_engines else '无'}")
+        
+            # 显示失败统计
+            if engine_health.failure_counts:
+                lines.append("失败统计:")
+                for engine, count in engine_health.failure_counts.items():
+                    if count > 0:
+                        lines.append(f"  - {engine}: {count} 次")
+        finally:
+            # 中途出错时也写出已收集的结果，再显示错误
+            if lines:
+                print("\n".join(lines), flush=True)
         
     except Exception as e:
-        print(f"❌ 测试过程中出错: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ 测试过程中出错: {type(e).__name__}: {e}")
+        if verbose:
+            import traceback
+            traceback.print_exc()
 
-@app.command()
-def search_health():
+_SEARCH_HEALTH_TIPS = (
+    "\n💡 提示:",
+    "  - 引擎连续失败3次后会被暂时禁用5分钟",
+    "  - 优先级数字越小表示优先级越高",
+    "  - 使用 'intellicli search-test' 测试搜索功能",
+)
+
+@app.command(name="search-health")
+@cli_error_guard("获取健康状态报告时出错")
+def search_health_cmd():
     """显示搜索引擎健康状态报告"""
     from .tools.web_search import get_search_health_report
     
-    print("🔍 搜索引擎健康状态报告")
-    print("=" * 50)
+    report = get_search_health_report()
     
-    try:
-        report = get_search_health_report()
-        
+    # 整份报告先收集成行，最后一次写出
+    lines = [
+        "🔍 搜索引擎健康状态报告",
+        "=" * 50,
         # 显示可用引擎
-        print(f"\n📊 可用引擎数量: {report['total_available']}")
-        if report['available_engines']:
-            print("✅ 可用引擎列表 (按优先级排序):")
-            for i, engine in enumerate(report['available_engines'], 1):
-                priority = report['engine_priorities'].get(engine, 'N/A')
-                failure_count = report['failure_counts'].get(engine, 0)
-                last_success = report['last_success'].get(engine, '从未成功')
-                
-                print(f"  {i}. {engine}")
-                print(f"     优先级: {priority}")
-                print(f"     失败次数: {failure_count}")
-                print(f"     最后成功: {last_success}")
-        else:
-            print("❌ 当前没有可用的搜索引擎")
-        
-        # 显示黑名单引擎
-        if report['blacklisted_engines']:
-            print("\n🚫 暂时禁用的引擎:")
-            for engine_info in report['blacklisted_engines']:
-                print(f"  - {engine_info['engine']} (剩余 {engine_info['remaining_minutes']} 分钟)")
-        
-        # 显示失败统计
-        if report['failure_counts']:
-            print("\n📈 失败统计:")
-            for engine, count in report['failure_counts'].items():
-                if count > 0:
-                    print(f"  - {engine}: {count} 次失败")
-        
-        print("\n💡 提示:")
-        print("  - 引擎连续失败3次后会被暂时禁用5分钟")
-        print("  - 优先级数字越小表示优先级越高")
-        print("  - 使用 'intellicli search-test' 测试搜索功能")
-        
-    except Exception as e:
-        print(f"❌ 获取健康状态报告时出错: {e}")
+        f"\n📊 可用引擎数量: {report['total_available']}",
+    ]
+    if report['available_engines']:
+        lines.append("✅ 可用引擎列表 (按优先级排序):")
+        for i, engine in enumerate(report['available_engines'], 1):
+            priority = report['engine_priorities'].get(engine, 'N/A')
+            failure_count = report['failure_counts'].get(engine, 0)
+            last_success = report['last_success'].get(engine, '从未成功')
+            
+            lines.append(f"  {i}. {engine}")
+            lines.append(f"     优先级: {priority}")
+            lines.append(f"     失败次数: {failure_count}")
+            lines.append(f"     最后成功: {last_success}")
+    else:
+        lines.append("❌ 当前没有可用的搜索引擎")
+    
+    # 显示黑名单引擎
+    if report['blacklisted_engines']:
+        lines.append("\n🚫 暂时禁用的引擎:")
+        for engine_info in report['blacklisted_engines']:
+            lines.append(f"  - {engine_info['engine']} (剩余 {engine_info['remaining_minutes']} 分钟)")
+    
+    # 显示失败统计
+    if report['failure_counts']:
+        lines.append("\n📈 失败统计:")
+        for engine, count in report['failure_counts'].items():
+            if count > 0:
+                lines.append(f"  - {engine}: {count} 次失败")
+    
+    lines.extend(_SEARCH_HEALTH_TIPS)
+    print("\n".join(lines))
 
 @app.command(name="mcp-config")
+@cli_error_guard("配置 MCP 服务器时出错")
 def mcp_config():
     """配置 MCP (Model Context Protocol) 服务器"""
-    try:
-        config_manager = ModelConfigManager()
-        success = config_manager.configure_mcp_only()
-        if not success:
-            raise typer.Exit(code=1)
-    except Exception as e:
-        ui.print_error(f"配置 MCP 服务器时出错: {e}")
+    config_manager = _model_config_manager()
+    success = config_manager.configure_mcp_only()
+    if not success:
         raise typer.Exit(code=1)
 
 @app.command(name="mcp-status")
+@cli_error_guard("获取 MCP 状态时出错")
 def mcp_status(ctx: typer.Context):
     """显示 MCP 服务器状态"""
-    try:
-        executor = ctx.obj["executor"]
-        mcp_status = executor.get_mcp_status()
-        
-        ui.print_section_header("MCP 服务器状态", "🔧")
-        
-        if not mcp_status:
-            ui.print_info("❌ MCP 功能未启用或未配置任何服务器")
-            ui.print_info("💡 使用 'intellicli mcp-config' 配置 MCP 服务器")
-            return
-        
-        statistics = mcp_status.get('statistics', {})
-        server_status = mcp_status.get('server_status', {})
-        
-        # 显示统计信息
-        ui.print_info("📊 统计信息:")
-        ui.print_info(f"   服务器总数: {statistics.get('total_servers', 0)}")
-        ui.print_info(f"   已连接服务器: {statistics.get('connected_servers', 0)}")
-        ui.print_info(f"   可用工具总数: {statistics.get('total_tools', 0)}")
-        ui.print_info(f"   健康检查状态: {'运行中' if statistics.get('health_check_running', False) else '已停止'}")
-        ui.print_info("")
-        
-        # 显示各服务器详细状态
-        if server_status:
-            ui.print_info("🔗 服务器详细状态:")
-            for server_name, status in server_status.items():
-                connected = status.get('connected', False)
-                tools_count = status.get('tools_count', 0)
-                description = status.get('description', '')
-                last_check = status.get('last_check')
-                error = status.get('error')
-                
-                status_icon = "✅" if connected else "❌"
-                ui.print_info(f"   {status_icon} {server_name}: {description}")
-                ui.print_info(f"      状态: {'已连接' if connected else '断开连接'}")
-                ui.print_info(f"      工具数量: {tools_count}")
-                if last_check:
-                    ui.print_info(f"      最后检查: {last_check}")
-                if error:
-                    ui.print_info(f"      错误: {error}")
-                ui.print_info("")
-        
-        # 显示工具分布
-        tools_by_server = statistics.get('tools_by_server', {})
-        if tools_by_server:
-            ui.print_info("🛠️ 工具分布:")
-            for server, count in tools_by_server.items():
-                ui.print_info(f"   {server}: {count} 个工具")
-        
-        ui.print_info("")
-        ui.print_info("💡 提示:")
-        ui.print_info("   - 使用 'intellicli mcp-config' 配置新的 MCP 服务器")
-        ui.print_info("   - 使用 'intellicli task' 命令可以调用 MCP 工具")
-        
-    except Exception as e:
-        ui.print_error(f"获取 MCP 状态时出错: {e}")
-        raise typer.Exit(code=1)
+    executor = ctx.obj["executor"]
+    mcp_status = executor.get_mcp_status()
+    
+    ui.print_section_header("MCP 服务器状态", "🔧")
+    
+    if not mcp_status:
+        ui.print_info_lines((
+            "❌ MCP 功能未启用或未配置任何服务器",
+            "💡 使用 'intellicli mcp-config' 配置 MCP 服务器",
+        ))
+        return
+    
+    statistics = mcp_status.get('statistics', {})
+    server_status = mcp_status.get('server_status', {})
+    
+    # 显示统计信息
+    lines = [
+        "📊 统计信息:",
+        f"   服务器总数: {statistics.get('total_servers', 0)}",
+        f"   已连接服务器: {statistics.get('connected_servers', 0)}",
+        f"   可用工具总数: {statistics.get('total_tools', 0)}",
+        f"   健康检查状态: {'运行中' if statistics.get('health_check_running', False) else '已停止'}",
+        "",
+    ]
+    
+    # 显示各服务器详细状态
+    if server_status:
+        lines.append("🔗 服务器详细状态:")
+        for server_name, status in server_status.items():
+            connected = status.get('connected', False)
+            tools_count = status.get('tools_count', 0)
+            description = status.get('description', '')
+            last_check = status.get('last_check')
+            error = status.get('error')
+            
+            status_icon = "✅" if connected else "❌"
+            lines.append(f"   {status_icon} {server_name}: {description}")
+            lines.append(f"      状态: {'已连接' if connected else '断开连接'}")
+            lines.append(f"      工具数量: {tools_count}")
+            if last_check:
+                lines.append(f"      最后检查: {last_check}")
+            if error:
+                lines.append(f"      错误: {error}")
+            lines.append("")
+    
+    # 显示工具分布
+    tools_by_server = statistics.get('tools_by_server', {})
+    if tools_by_server:
+        lines.append("🛠️ 工具分布:")
+        for server, count in tools_by_server.items():
+            lines.append(f"   {server}: {count} 个工具")
+    ui.print_info_lines(lines)
+    
+    ui.print_info_lines(_MCP_STATUS_TIPS)
 
 @app.command(name="mcp-refresh")
+@cli_error_guard("刷新 MCP 工具时出错")
 def mcp_refresh(ctx: typer.Context):
     """刷新 MCP 工具列表"""
-    try:
-        executor = ctx.obj["executor"]
-        
-        ui.print_info("🔄 正在刷新 MCP 工具列表...")
-        executor.refresh_mcp_tools()
-        ui.print_success("✅ MCP 工具列表已刷新")
-        
-        # 显示更新后的状态
-        mcp_status = executor.get_mcp_status()
-        if mcp_status:
-            statistics = mcp_status.get('statistics', {})
-            ui.print_info(f"📊 当前工具总数: {statistics.get('total_tools', 0)}")
-        
-    except Exception as e:
-        ui.print_error(f"刷新 MCP 工具时出错: {e}")
-        raise typer.Exit(code=1)
+    executor = ctx.obj["executor"]
+    
+    ui.print_info("🔄 正在刷新 MCP 工具列表...")
+    executor.refresh_mcp_tools()
+    ui.print_success("✅ MCP 工具列表已刷新")
+    
+    # 显示更新后的状态
+    mcp_status = executor.get_mcp_status()
+    if mcp_status:
+        statistics = mcp_status.get('statistics', {})
+        ui.print_info(f"📊 当前工具总数: {statistics.get('total_tools', 0)}")
 
 @app.command(name="mcp-tools")
+@cli_error_guard("获取 MCP 工具列表时出错")
 def mcp_tools(ctx: typer.Context):
     """显示所有可用的 MCP 工具"""
-    try:
-        executor = ctx.obj["executor"]
-        
-        ui.print_section_header("可用的 MCP 工具", "🛠️")
-        
-        # 获取所有工具信息
-        all_tools = executor.get_tool_info()
-        
-        # 分离内置工具和 MCP 工具
-        builtin_tools = []
-        mcp_tools = []
-        
-        for tool in all_tools:
-            if tool.get('is_mcp_tool', False):
-                mcp_tools.append(tool)
-            else:
-                builtin_tools.append(tool)
-        
-        if not mcp_tools:
-            ui.print_warning("❌ 当前没有可用的 MCP 工具")
-            ui.print_info("💡 使用 'intellicli mcp-config' 配置 MCP 服务器")
-            return
-        
-        # 按服务器分组显示 MCP 工具
-        tools_by_server = {}
-        for tool in mcp_tools:
-            server_name = tool.get('server_name', 'unknown')
-            if server_name not in tools_by_server:
-                tools_by_server[server_name] = []
-            tools_by_server[server_name].append(tool)
-        
-        for server_name, tools in tools_by_server.items():
-            ui.print_info(f"\n📡 服务器: {server_name}")
-            ui.print_info(f"   工具数量: {len(tools)}")
+    executor = ctx.obj["executor"]
+    
+    ui.print_section_header("可用的 MCP 工具", "🛠️")
+    
+    # 获取所有工具信息
+    all_tools = executor.get_tool_info()
+    
+    # 分离内置工具和 MCP 工具，MCP 工具同时按服务器分组
+    builtin_count = 0
+    tools_by_server = defaultdict(list)
+    
+    for tool in all_tools:
+        if tool.get('is_mcp_tool', False):
+            tools_by_server[tool.get('server_name', 'unknown')].append(tool)
+        else:
+            builtin_count += 1
+    
+    mcp_count = len(all_tools) - builtin_count
+    if not mcp_count:
+        ui.print_warning("❌ 当前没有可用的 MCP 工具")
+        ui.print_info("💡 使用 'intellicli mcp-config' 配置 MCP 服务器")
+        return
+    
+    # 工具列表可能很长，逐行收集后一次输出
+    lines = []
+    for server_name, tools in tools_by_server.items():
+        lines.append(f"\n📡 服务器: {server_name}")
+        lines.append(f"   工具数量: {len(tools)}")
+        
+        for tool in tools:
+            tool_name = tool.get('name', 'unknown')
+            description = tool.get('description', '无描述')
+            # 清理描述中的服务器前缀
+            if description.startswith(f"[MCP:{server_name}] "):
+                description = description[len(f"[MCP:{server_name}] "):]
+            
+            lines.append(f"   • {tool_name}: {description}")
             
-            for tool in tools:
-                tool_name = tool.get('name', 'unknown')
-                description = tool.get('description', '无描述')
-                # 清理描述中的服务器前缀
-                if description.startswith(f"[MCP:{server_name}] "):
-                    description = description[len(f"[MCP:{server_name}] "):]
+            # 显示参数信息
+            parameters = tool.get('parameters', [])
+            if parameters:
+                required_names, optional_names = [], []
+                for p in parameters:
+                    (required_names if p.get('required', False) else optional_names).append(p['name'])
                 
-                ui.print_info(f"   • {tool_name}: {description}")
+                if required_names:
+                    lines.append(f"     必需参数: {', '.join(required_names)}")
                 
-                # 显示参数信息
-                parameters = tool.get('parameters', [])
-                if parameters:
-                    required_params = [p for p in parameters if p.get('required', False)]
-                    optional_params = [p for p in parameters if not p.get('required', False)]
-                    
-                    if required_params:
-                        param_names = [p['name'] for p in required_params]
-                        ui.print_info(f"     必需参数: {', '.join(param_names)}")
-                    
-                    if optional_params:
-                        param_names = [p['name'] for p in optional_params]
-                        ui.print_info(f"     可选参数: {', '.join(param_names)}")
-        
-        # 显示内置工具数量对比
-        ui.print_info(f"\n📊 工具统计:")
-        ui.print_info(f"   内置工具: {len(builtin_tools)} 个")
-        ui.print_info(f"   MCP 工具: {len(mcp_tools)} 个")
-        ui.print_info(f"   总计: {len(all_tools)} 个")
-        
-        ui.print_info("\n💡 提示:")
-        ui.print_info("   - 使用 'intellicli task \"<任务描述>\"' 来执行任务")
-        ui.print_info("   - AI 会自动选择合适的工具来完成任务")
-        ui.print_info("   - 可以在任务描述中明确指定使用某个工具")
-        
-    except Exception as e:
-        ui.print_error(f"获取 MCP 工具列表时出错: {e}")
-        raise typer.Exit(code=1)
+                if optional_names:
+                    lines.append(f"     可选参数: {', '.join(optional_names)}")
+    ui.print_info_lines(lines)
+    
+    # 显示内置工具数量对比
+    ui.print_info_lines((
+        "\n📊 工具统计:",
+        f"   内置工具: {builtin_count} 个",
+        f"   MCP 工具: {mcp_count} 个",
+        f"   总计: {len(all_tools)} 个",
+    ))
+    
+    ui.print_info_lines(_MCP_TOOLS_TIPS)
 
 @app.command()
+@cli_error_guard("复盘过程中出错")
 def review(
+    ctx: typer.Context,
     goal: Optional[str] = typer.Option(None, "--goal", "-g", help="指定要复盘的任务目标"),
     auto_fix: bool = typer.Option(False, "--auto-fix", "-f", help="自动执行补充计划")
 ):
     """
     对任务执行结果进行复盘分析
     """
-    try:
-        config = load_config()
-        
-        # 检查复盘功能是否启用
-        review_config = config.get('task_review', {})
-        if not review_config.get('enabled', False):
-            ui.print_review_disabled()
-            return
-        
-        # 初始化模型客户端
-        primary_client = get_model_client(config)
-        
-        # 创建智能代理
-        agent = IntelliAgent(primary_client, config)
-        
-        # 执行手动复盘
-        if goal:
-            ui.print_info(f"🔍 开始复盘任务: {goal}")
-        else:
-            ui.print_info("🔍 开始复盘最近的任务")
-        
-        review_result = agent.manual_review(goal)
-        
-        if review_result:
-            ui.print_success("✅ 复盘完成")
-        else:
-            ui.print_warning("⚠️ 复盘未找到相关任务")
-            
-    except Exception as e:
-        ui.print_error(f"复盘过程中出错: {e}")
-        raise typer.Exit(code=1)
+    config = ctx.obj["config"]
+    
+    # 检查复盘功能是否启用
+    review_config = get_review_config(config)
+    if not review_config.enabled:
+        ui.print_review_disabled()
+        return
+    
+    # 初始化模型客户端
+    primary_client = get_model_client(config)
+    
+    # 创建智能代理
+    from .agent.agent import Agent as IntelliAgent
+    agent = IntelliAgent(primary_client, config)
+    
+    # 执行手动复盘
+    if goal:
+        ui.print_info(f"🔍 开始复盘任务: {goal}")
+    else:
+        ui.print_info("🔍 开始复盘最近的任务")
+    
+    review_result = agent.manual_review(goal)
+    
+    if review_result:
+        ui.print_success("✅ 复盘完成")
+    else:
+        ui.print_warning("⚠️ 复盘未找到相关任务")
 
 @app.command()
-def history():
+@cli_error_guard("获取历史记录时出错")
+def history(ctx: typer.Context):
     """
     显示任务执行历史
     """
-    try:
-        config = load_config()
-        primary_client = get_model_client(config)
-        
-        # 创建智能代理
-        agent = IntelliAgent(primary_client, config)
-        
-        # 获取执行历史
-        history = agent.get_execution_history()
-        
-        # 使用新的UI函数显示历史
-        ui.print_task_history(history)
-            
-    except Exception as e:
-        ui.print_error(f"获取历史记录时出错: {e}")
-        raise typer.Exit(code=1)
+    config = ctx.obj["config"]
+    primary_client = get_model_client(config)
+    
+    # 创建智能代理
+    from .agent.agent import Agent as IntelliAgent
+    agent = IntelliAgent(primary_client, config)
+    
+    # 获取执行历史
+    history = agent.get_execution_history()
+    
+    # 使用新的UI函数显示历史
+    ui.print_task_history(history)
 
-@app.callback()
-def callback(ctx: typer.Context):
+class _CommandContext(dict):
     """
-    IntelliCLI: 一个智能 CLI 助手，具有可插拔模型和动态任务规划。
+    命令间共享的组件（ctx.obj）。除配置外，各组件在命令首次访问时才创建，
+    配置类等不使用模型的命令因此无需初始化模型客户端、规划器和执行器。
     """
-    config = load_config()
     
-    # 初始化所有模型客户端
-    model_clients = get_model_clients(config)
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config=config)
     
-    if not model_clients:
-        ui.print_error("❌ 未能初始化任何模型客户端，请检查配置")
-        raise typer.Exit(1)
+    def __missing__(self, key: str):
+        builder = getattr(self, f"_build_{key}", None)
+        if builder is None:
+            raise KeyError(key)
+        value = builder()
+        self[key] = value
+        return value
     
-    # 创建智能模型路由器
-    model_router = ModelRouter(model_clients, config)
+    def close(self):
+        """命令结束时关闭已创建的执行器（不会为此创建组件）"""
+        executor = self.get("executor")
+        if executor is not None:
+            executor.close()
     
-    # 使用主模型创建规划器（后续会动态更新）
-    primary_model = config.get('models', {}).get('primary', list(model_clients.keys())[0])
-    primary_client = model_clients.get(primary_model)
+    def _build_model_clients(self):
+        # 初始化所有模型客户端
+        model_clients = get_model_clients(self["config"])
+        if not model_clients:
+            ui.print_error("❌ 未能初始化任何模型客户端，请检查配置")
+            raise typer.Exit(1)
+        return model_clients
     
-    planner = Planner(primary_client)
-    executor = Executor(model_client=primary_client)  # 传递主模型客户端给executor
-    agent = Agent(model_router, planner, executor)
+    def _build_model_router(self):
+        # 创建智能模型路由器
+        from .agent.model_router import ModelRouter
+        return ModelRouter(self["model_clients"], self["config"])
     
-    ctx.obj = {
-        "config": config,
-        "model_router": model_router,
-        "model_clients": model_clients,
-        "planner": planner,
-        "executor": executor,
-        "agent": agent
-    }
+    def _build_executor(self):
+        from .agent.executor import Executor
+        # 传递主模型客户端给executor
+        return Executor(model_client=self["model_router"].get_primary_model_client())
+    
+    def _build_planner(self):
+        from .agent.planner import Planner, hedge_delay_from_config
+        from .agent.plan_cache import PlanCache
+        # 使用主模型创建规划器（后续会动态更新）
+        executor = self["executor"]
+        return Planner(
+            self["model_router"].get_primary_model_client(),
+            plan_cache=PlanCache.from_config(self["config"]),
+            speculator=executor.speculate,
+            hedge_delay=hedge_delay_from_config(self["config"])
+        )
+    
+    def _build_agent(self):
+        return Agent(self["model_router"], self["planner"], self["executor"], self["config"])
+
+@app.callback()
+def callback(ctx: typer.Context):
+    """
+    IntelliCLI: 一个智能 CLI 助手，具有可插拔模型和动态任务规划。
+    """
+    config = load_config()
+    configure_logging(config)
+    ctx.obj = _CommandContext(config)
+    ctx.call_on_close(ctx.obj.close)
 
 def main():
     """主入口点函数，供 pyproject.toml 使用"""
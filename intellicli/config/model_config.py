@@ -6,9 +6,111 @@
 import os
 import yaml
 import json
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Dict, List, Any, Optional
 from ..ui.display import ui
 
+# 优先使用 LibYAML 的 C 实现解析和写出配置，不可用时回退到纯 Python 实现
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
+# 已解析的配置文件：绝对路径 -> ((mtime_ns, size, inode), 配置)，按最近使用淘汰
+_PARSED_CONFIGS = OrderedDict()
+_PARSED_CONFIGS_MAXSIZE = 16
+_PARSED_CONFIGS_LOCK = threading.Lock()
+
+# 早期版本可选的跨进程解析缓存文件，保存了包括 API 密钥在内的完整配置；
+# 该缓存已移除，首次读取配置时删除残留的文件
+_LEGACY_PARSED_CONFIGS_FILE = Path.home() / '.intellicli_config_cache.json'
+_legacy_file_checked = False
+
+def _remove_legacy_parsed_configs_file():
+    """删除早期版本留下的解析缓存文件（每个进程只检查一次）"""
+    global _legacy_file_checked
+    if _legacy_file_checked:
+        return
+    _legacy_file_checked = True
+    try:
+        os.remove(_LEGACY_PARSED_CONFIGS_FILE)
+    except OSError:
+        pass
+
+def forget_parsed_config(config_path: str):
+    """
+    清除配置文件的解析缓存。配置文件被改写或重置后调用，
+    即使修改时间和大小恰好未变，下次读取也会重新解析。
+    """
+    key = os.path.abspath(config_path)
+    with _PARSED_CONFIGS_LOCK:
+        _PARSED_CONFIGS.pop(key, None)
+
+def config_signature(config_path: str):
+    """
+    返回配置文件的 (mtime_ns, size, inode)，文件不存在时返回 None。
+    编辑器以替换文件的方式保存时 inode 会变化，即使修改时间和大小恰好相同。
+    """
+    try:
+        st = os.stat(config_path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def load_yaml_config(config_path: str) -> Any:
+    """
+    读取并解析 YAML 配置文件，文件未变化时直接返回缓存的解析结果。
+    返回的对象在多个调用方之间共享，需要修改配置时请自行重新读取。
+    """
+    key = os.path.abspath(config_path)
+    signature = config_signature(key)
+    with _PARSED_CONFIGS_LOCK:
+        cached = _PARSED_CONFIGS.get(key)
+        if cached is not None and signature is not None and cached[0] == signature:
+            _PARSED_CONFIGS.move_to_end(key)
+            return cached[1]
+    
+    _remove_legacy_parsed_configs_file()
+    
+    with open(key, 'rb') as f:
+        data = f.read()
+    
+    # 直接交给解析器原始字节，由 LibYAML 自行解码 UTF-8
+    config = yaml.load(data, Loader=SafeLoader)
+    
+    if signature is not None:
+        with _PARSED_CONFIGS_LOCK:
+            _PARSED_CONFIGS[key] = (signature, config)
+            _PARSED_CONFIGS.move_to_end(key)
+            while len(_PARSED_CONFIGS) > _PARSED_CONFIGS_MAXSIZE:
+                _PARSED_CONFIGS.popitem(last=False)
+    return config
+
+@dataclass(frozen=True)
+class ReviewConfig:
+    """task_review 配置段解析后的只读设置"""
+    enabled: bool = False
+    auto_review: bool = False
+    review_threshold: float = 0.8
+    max_iterations: int = 3
+    response_cache_path: Optional[str] = None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'ReviewConfig':
+        """从完整配置中解析复盘设置，缺失的项使用默认值"""
+        review_config = (config or {}).get('task_review') or {}
+        defaults = cls()
+        return cls(
+            enabled=bool(review_config.get('enabled', defaults.enabled)),
+            auto_review=bool(review_config.get('auto_review', defaults.auto_review)),
+            review_threshold=review_config.get('review_threshold', defaults.review_threshold),
+            max_iterations=review_config.get('max_iterations', defaults.max_iterations),
+            response_cache_path=review_config.get('response_cache_path')
+        )
+
 class ModelConfigManager:
     """模型配置管理器"""
     
@@ -144,8 +246,7 @@ class ModelConfigManager:
             return False
         
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            config = load_yaml_config(self.config_path)
             
             # 检查是否有模型配置
             if 'models' not in config:
@@ -177,7 +278,7 @@ class ModelConfigManager:
         if os.path.exists(self.config_path):
             try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
-                    existing_config = yaml.safe_load(f) or {}
+                    existing_config = yaml.load(f, Loader=SafeLoader) or {}
                 
                 if existing_config:
                     ui.print_warning("⚠️ 检测到现有配置文件")
@@ -834,7 +935,7 @@ class ModelConfigManager:
         try:
             # 读取现有配置
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=SafeLoader)
         except Exception as e:
             ui.print_error(f"❌ 读取配置文件失败: {e}")
             return False
@@ -857,7 +958,8 @@ class ModelConfigManager:
         # 保存配置
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, indent=2)
+            forget_parsed_config(self.config_path)
             
             ui.print_success("✅ 复盘功能配置已更新！")
             ui.print_info("")
@@ -882,7 +984,7 @@ class ModelConfigManager:
         try:
             # 读取现有配置
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=SafeLoader)
         except Exception as e:
             ui.print_error(f"❌ 读取配置文件失败: {e}")
             return False
@@ -911,7 +1013,8 @@ class ModelConfigManager:
         # 保存配置
         try:
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, indent=2)
+            forget_parsed_config(self.config_path)
             
             ui.print_success("✅ MCP 服务器配置已更新！")
             ui.print_info("")
@@ -994,7 +1097,8 @@ class ModelConfigManager:
             os.makedirs(os.path.dirname(self.config_path) if os.path.dirname(self.config_path) else '.', exist_ok=True)
             
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, indent=2)
+            forget_parsed_config(self.config_path)
             
             ui.print_success(f"✅ 配置已保存到: {self.config_path}")
             return True
@@ -1005,8 +1109,7 @@ class ModelConfigManager:
     def validate_config(self) -> bool:
         """验证配置文件"""
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            config = load_yaml_config(self.config_path)
             
             # 基本结构验证
             if 'models' not in config:
@@ -1085,8 +1188,7 @@ class ModelConfigManager:
             return
         
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
+            config = load_yaml_config(self.config_path)
             
             ui.print_section_header("当前模型配置", "⚙️")
             
@@ -1162,5 +1264,7 @@ class ModelConfigManager:
             if confirm not in ['y', 'yes', '是']:
                 ui.print_info("已取消重新配置")
                 return False
+            # 旧配置（包括其中的 API 密钥）不再保留在解析缓存中
+            forget_parsed_config(self.config_path)
         
         return self.run_config_wizard() 
\ No newline at end of file
@@ -7,6 +7,7 @@ import os
 import yaml
 from typing import Dict, List, Any, Optional
 from ..ui.display import ui
+from .model_config import SafeLoader, SafeDumper, forget_parsed_config
 import time
 
 class SearchConfigManager:
@@ -340,7 +341,7 @@ class SearchConfigManager:
         
         try:
             with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f) or {}
+                config = yaml.load(f, Loader=SafeLoader) or {}
             return config.get("search_engines", {}).get("engines", {})
         except Exception:
             return {}
@@ -352,7 +353,7 @@ class SearchConfigManager:
         if os.path.exists(self.config_path):
             try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
-                    full_config = yaml.safe_load(f) or {}
+                    full_config = yaml.load(f, Loader=SafeLoader) or {}
             except Exception:
                 pass
         
@@ -375,7 +376,7 @@ class SearchConfigManager:
         if os.path.exists(self.config_path):
             try:
                 with open(self.config_path, 'r', encoding='utf-8') as f:
-                    full_config = yaml.safe_load(f) or {}
+                    full_config = yaml.load(f, Loader=SafeLoader) or {}
             except Exception:
                 pass
         
@@ -392,7 +393,8 @@ class SearchConfigManager:
             os.makedirs(os.path.dirname(self.config_path) if os.path.dirname(self.config_path) else '.', exist_ok=True)
             
             with open(self.config_path, 'w', encoding='utf-8') as f:
-                yaml.dump(config, f, default_flow_style=False, allow_unicode=True, indent=2)
+                yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False, allow_unicode=True, indent=2)
+            forget_parsed_config(self.config_path)
         except Exception as e:
             ui.print_error(f"❌ 保存配置失败: {e}")
     
@@ -21,6 +21,11 @@ class MCPToolManager:
         self.server_configs = server_configs or []
         self.clients: Dict[str, MCPClient] = {}
         self.all_tools: Dict[str, MCPTool] = {}
+        # get_all_tools 的转换结果，工具集变化时置空；健康检查线程会更新工具集，
+        # 每次置空都递增代数，构建期间代数变化的结果不写入缓存
+        self._tool_info_cache: Optional[List[Dict[str, Any]]] = None
+        self._tool_cache_generation = 0
+        self._tool_cache_lock = threading.Lock()
         self.server_status: Dict[str, Dict[str, Any]] = {}
         self.health_check_interval = 30  # 健康检查间隔（秒）
         self.health_check_thread = None
@@ -61,6 +66,7 @@ class MCPToolManager:
                           if tool.server_name == server_name]
         for tool_name in tools_to_remove:
             del self.all_tools[tool_name]
+        self._invalidate_tool_cache()
         
         # 移除配置
         self.server_configs = [config for config in self.server_configs 
@@ -152,6 +158,7 @@ class MCPToolManager:
                 tool.name = tool_name
             
             self.all_tools[tool_name] = tool
+        self._invalidate_tool_cache()
         
         # 更新状态
         self.server_status[server_name]["tools_count"] = len(tools)
@@ -163,6 +170,7 @@ class MCPToolManager:
             client.disconnect()
         self.clients.clear()
         self.all_tools.clear()
+        self._invalidate_tool_cache()
         
         # 更新状态
         for server_name in self.server_status:
@@ -171,11 +179,25 @@ class MCPToolManager:
         
         logger.info("已断开所有 MCP 服务器连接")
     
+    def _invalidate_tool_cache(self):
+        """工具集变化后置空 get_all_tools 的缓存"""
+        with self._tool_cache_lock:
+            self._tool_cache_generation += 1
+            self._tool_info_cache = None
+    
     def get_all_tools(self) -> List[Dict[str, Any]]:
-        """获取所有 MCP 工具信息（兼容执行器格式）"""
+        """
+        获取所有 MCP 工具信息（兼容执行器格式）。
+        工具集未变化时返回缓存的同一列表，调用方不应修改。
+        """
+        with self._tool_cache_lock:
+            if self._tool_info_cache is not None:
+                return self._tool_info_cache
+            generation = self._tool_cache_generation
+        
         tool_info_list = []
         
-        for tool_name, tool in self.all_tools.items():
+        for tool_name, tool in list(self.all_tools.items()):
             # 转换为执行器期望的格式
             parameters = []
             
@@ -201,6 +223,10 @@ class MCPToolManager:
             
             tool_info_list.append(tool_info)
         
+        with self._tool_cache_lock:
+            # 构建期间工具集已变化时不缓存，下次调用重新构建
+            if self._tool_cache_generation == generation:
+                self._tool_info_cache = tool_info_list
         return tool_info_list
     
     def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Any:
@@ -264,30 +290,39 @@ class MCPToolManager:
                 time.sleep(5)  # 出错时短暂休息
     
     def _perform_health_check(self):
-        """执行健康检查"""
-        for server_name, client in self.clients.items():
-            try:
-                if client.ping():
-                    self.server_status[server_name]["connected"] = True
-                    self.server_status[server_name]["error"] = None
-                else:
-                    self.server_status[server_name]["connected"] = False
-                    self.server_status[server_name]["error"] = "Ping failed"
-                    
-                    # 尝试重新连接
-                    if client.server_config.auto_restart:
-                        logger.info(f"尝试重新连接 MCP 服务器: {server_name}")
-                        if self._connect_server(client.server_config):
-                            logger.info(f"成功重新连接 MCP 服务器: {server_name}")
-                        else:
-                            logger.error(f"重新连接 MCP 服务器失败: {server_name}")
-                
-                self.server_status[server_name]["last_check"] = datetime.now()
-                
-            except Exception as e:
-                logger.error(f"检查 MCP 服务器 {server_name} 健康状态时出错: {e}")
+        """执行健康检查，各服务器的 ping 并行进行"""
+        clients = list(self.clients.items())
+        if not clients:
+            return
+        
+        with ThreadPoolExecutor(max_workers=min(5, len(clients))) as executor:
+            for server_name, client in clients:
+                executor.submit(self._check_server_health, server_name, client)
+    
+    def _check_server_health(self, server_name: str, client: MCPClient):
+        """检查单个服务器的健康状态，必要时尝试重新连接"""
+        try:
+            if client.ping():
+                self.server_status[server_name]["connected"] = True
+                self.server_status[server_name]["error"] = None
+            else:
                 self.server_status[server_name]["connected"] = False
-                self.server_status[server_name]["error"] = str(e)
+                self.server_status[server_name]["error"] = "Ping failed"
+                
+                # 尝试重新连接
+                if client.server_config.auto_restart:
+                    logger.info(f"尝试重新连接 MCP 服务器: {server_name}")
+                    if self._connect_server(client.server_config):
+                        logger.info(f"成功重新连接 MCP 服务器: {server_name}")
+                    else:
+                        logger.error(f"重新连接 MCP 服务器失败: {server_name}")
+            
+            self.server_status[server_name]["last_check"] = datetime.now()
+            
+        except Exception as e:
+            logger.error(f"检查 MCP 服务器 {server_name} 健康状态时出错: {e}")
+            self.server_status[server_name]["connected"] = False
+            self.server_status[server_name]["error"] = str(e)
     
     def get_tool_by_name(self, tool_name: str) -> Optional[MCPTool]:
         """根据名称获取工具"""
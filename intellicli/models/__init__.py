@@ -1,14 +1,24 @@
 """
 模型客户端包
 提供各种AI模型的统一接口
+
+各客户端依赖的 SDK 较重，按需在首次访问时导入。
 """
 
+import importlib
+
 from .base_llm import BaseLLM
-from .ollama_client import OllamaClient
-from .gemini_client import GeminiClient
-from .deepseek_client import DeepSeekClient
-from .openai_client import OpenAIClient, ChatGPTClient
-from .claude_client import ClaudeClient
+
+# 导出名称 -> 所在子模块
+_LAZY_EXPORTS = {
+    "OllamaClient": ".ollama_client",
+    "GeminiClient": ".gemini_client",
+    "DeepSeekClient": ".deepseek_client",
+    "OpenAIClient": ".openai_client",
+    "ChatGPTClient": ".openai_client",
+    "ClaudeClient": ".claude_client",
+    "CachedModelClient": ".cached_client",
+}
 
 __all__ = [
     "BaseLLM", 
@@ -17,5 +27,14 @@ __all__ = [
     "DeepSeekClient",
     "OpenAIClient",
     "ChatGPTClient",
-    "ClaudeClient"
+    "ClaudeClient",
+    "CachedModelClient"
 ]
+
+def __getattr__(name):
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
@@ -7,6 +7,9 @@ class BaseLLM(ABC):
     该类定义了所有模型客户端必须实现的通用接口。
     """
 
+    # 是否支持 generate(prompt, cache_breakpoints=[...]) 标记可缓存的提示前缀
+    supports_cache_breakpoints = False
+
     @abstractmethod
     def __init__(self, model_name: str, **kwargs):
         """
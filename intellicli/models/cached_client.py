@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import closing
+from typing import List, Dict, Any, Optional
+from .base_llm import BaseLLM
+
+logger = logging.getLogger(__name__)
+
+class CachedModelClient(BaseLLM):
+    """
+    为模型客户端的文本生成增加精确匹配的响应缓存。
+    相同模型、相同提示的重复调用直接返回缓存的响应，不再请求模型。
+    """
+
+    def __init__(self, model_client: BaseLLM, maxsize: int = 128, db_path: str = None):
+        """
+        包装模型客户端。
+
+        Args:
+            model_client (BaseLLM): 被包装的模型客户端。
+            maxsize (int): 内存中最多缓存的响应数量（LRU 淘汰）。
+            db_path (str, optional): SQLite 缓存文件路径。提供时响应会持久化，跨进程复用。
+        """
+        super().__init__(getattr(model_client, 'model_name', ''))
+        self.model_client = model_client
+        self.maxsize = maxsize
+        self.db_path = os.path.expanduser(db_path) if db_path else None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.db_path:
+            self._init_db()
+
+    def _init_db(self):
+        """创建持久化缓存表"""
+        try:
+            os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, response TEXT)"
+                )
+        except (OSError, sqlite3.Error) as e:
+            logger.warning("无法初始化响应缓存 %s: %s", self.db_path, e)
+            self.db_path = None
+
+    def _cache_key(self, prompt: str) -> str:
+        """按模型名称和提示内容计算缓存键"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(self.model_name.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(prompt.encode('utf-8'))
+        return digest.hexdigest()
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """
+        生成文本响应，命中缓存时直接返回。
+        带额外生成参数的调用不使用缓存。
+        """
+        if kwargs:
+            return self.model_client.generate(prompt, **kwargs)
+
+        key = self._cache_key(prompt)
+        response = self._lookup(key)
+        if response is not None:
+            return response
+
+        response = self.model_client.generate(prompt)
+        # 客户端以 "错误: ..." 文本返回调用失败，不缓存这类响应
+        if isinstance(response, str) and not response.startswith("错误"):
+            self._store(key, response)
+        return response
+
+    def _lookup(self, key: str) -> Optional[str]:
+        """依次查找内存缓存和持久化缓存"""
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        if not self.db_path:
+            return None
+
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                row = conn.execute("SELECT response FROM response_cache WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error:
+            return None
+
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def _store(self, key: str, response: str):
+        """写入内存缓存，并在启用时写入持久化缓存"""
+        self._remember(key, response)
+
+        if not self.db_path:
+            return
+
+        try:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, response) VALUES (?, ?)",
+                    (key, response)
+                )
+        except sqlite3.Error as e:
+            logger.warning("写入响应缓存失败: %s", e)
+
+    def _remember(self, key: str, response: str):
+        """写入内存 LRU 缓存"""
+        with self._lock:
+            self._cache[key] = response
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        """工具调用响应不缓存，直接转发"""
+        return self.model_client.generate_with_tools(prompt, tools, **kwargs)
+
+    def generate_vision(self, prompt: str, image_path: str, **kwargs) -> str:
+        """视觉响应依赖图像内容，不缓存，直接转发"""
+        return self.model_client.generate_vision(prompt, image_path, **kwargs)
+
+    def __getattr__(self, name: str):
+        """其余属性转发给被包装的客户端"""
+        return getattr(self.model_client, name)
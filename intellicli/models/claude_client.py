@@ -15,6 +15,8 @@ class ClaudeClient(BaseLLM):
     用于与Claude API交互的客户端。
     """
 
+    supports_cache_breakpoints = True
+
     def __init__(self, model_name: str, api_key: str = None):
         """
         初始化Claude客户端。
@@ -36,12 +38,14 @@ class ClaudeClient(BaseLLM):
     def generate(self, prompt: str, **kwargs) -> str:
         """
         从Claude模型生成文本响应。
+
+        `cache_breakpoints` 为提示中的字符位置列表，每个位置之前的内容标记为可缓存。
         """
         # 设置默认参数
         message_kwargs = {
             "model": self.model_name,
             "max_tokens": kwargs.get("max_tokens", 1000),
-            "messages": [{"role": "user", "content": prompt}],
+            "messages": [{"role": "user", "content": self._build_content(prompt, kwargs.get("cache_breakpoints"))}],
         }
         
         # 添加其他参数
@@ -59,6 +63,28 @@ class ClaudeClient(BaseLLM):
             print(f"调用Claude API时出错: {e}")
             return f"错误: {e}"
 
+    def _build_content(self, prompt: str, cache_breakpoints: Optional[List[int]] = None):
+        """
+        按缓存断点将提示拆分为多个文本块，断点前的块添加 cache_control 标记。
+        """
+        if not cache_breakpoints:
+            return prompt
+        
+        content = []
+        start = 0
+        # Claude API 每次请求最多支持 4 个缓存断点
+        for breakpoint in sorted(set(cache_breakpoints))[:4]:
+            if start < breakpoint <= len(prompt):
+                content.append({
+                    "type": "text",
+                    "text": prompt[start:breakpoint],
+                    "cache_control": {"type": "ephemeral"}
+                })
+                start = breakpoint
+        if start < len(prompt):
+            content.append({"type": "text", "text": prompt[start:]})
+        return content
+
     def generate_with_tools(self, prompt: str, tools: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
         """
         使用工具调用生成响应。
@@ -1,21 +1,12 @@
 """
 工具包
 提供文件系统、Shell、Python分析、代码分析、Git集成、文档管理等功能工具
-"""
 
-# 工具包的初始化文件
-# 各个工具模块通过动态导入加载
+各工具模块由执行器通过动态导入加载，这里按需在首次访问时导入，
+避免导入任一工具时连带加载全部工具及其依赖。
+"""
 
-# 导入所有工具模块以确保它们可用
-from . import file_system
-from . import shell
-from . import python_analyzer
-from . import system_operations
-from . import code_analyzer
-from . import git_operations
-from . import document_manager
-from . import image_processor
-from . import web_search
+import importlib
 
 __all__ = [
     'file_system',
@@ -28,3 +19,8 @@ __all__ = [
     'image_processor',
     'web_search'
 ]
+
+def __getattr__(name):
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return importlib.import_module(f".{name}", __name__)
@@ -5,7 +5,6 @@
 
 import os
 import json
-import yaml
 import re
 from typing import Dict, List, Any, Optional, Union
 from pathlib import Path
@@ -10,6 +10,7 @@ import re
 import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
+from ..config.model_config import SafeLoader
 
 # 搜索引擎健康状态管理
 class SearchEngineHealth:
@@ -83,7 +84,7 @@ def _load_search_config() -> Dict[str, Any]:
     if os.path.exists(config_path):
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f) or {}
+                config = yaml.load(f, Loader=SafeLoader) or {}
             return config.get("search_engines", {}).get("engines", {})
         except Exception:
             return {}
@@ -4,17 +4,11 @@
 """
 
 import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Sequence
 from dataclasses import dataclass
 import time
 
-# 导入 prompt_toolkit 相关模块
-from prompt_toolkit import prompt
-from prompt_toolkit.history import InMemoryHistory
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.styles import Style
-from prompt_toolkit.shortcuts import print_formatted_text
-from prompt_toolkit.formatted_text import FormattedText
+# prompt_toolkit 导入较慢，仅在首次读取交互输入时导入
 
 # ANSI颜色代码
 class Colors:
@@ -71,6 +65,20 @@ class ModernUI:
         self._current_section = None
         self._step_start_time = None  # 添加步骤开始时间追踪
         
+        # 输入历史、自动补全和提示样式在首次读取输入时创建
+        self.input_history = None
+        self.completer = None
+        self.prompt_style = None
+    
+    def _init_input_components(self):
+        """创建 prompt_toolkit 的输入历史、自动补全和样式"""
+        if self.prompt_style is not None:
+            return
+        
+        from prompt_toolkit.history import InMemoryHistory
+        from prompt_toolkit.completion import WordCompleter
+        from prompt_toolkit.styles import Style
+        
         # 初始化输入历史记录
         self.input_history = InMemoryHistory()
         
@@ -384,12 +392,23 @@ class ModernUI:
         """显示信息"""
         self._print(f"💡 {info_message}", Colors.BRIGHT_BLUE)
     
+    def print_info_lines(self, info_messages: Sequence[str]):
+        """批量显示多条信息，合并为一次写出和刷新"""
+        if not info_messages:
+            return
+        self._print("\n".join(self._colorize(f"💡 {message}", Colors.BRIGHT_BLUE) for message in info_messages))
+    
     def print_success(self, success_message: str):
         """显示成功信息"""
         self._print(f"✅ {success_message}", Colors.BRIGHT_GREEN)
     
     def get_user_input(self, prompt_text: str = "IntelliCLI") -> str:
         """获取用户输入 - 支持方向键和正确的中文处理"""
+        from prompt_toolkit import prompt
+        from prompt_toolkit.shortcuts import print_formatted_text
+        from prompt_toolkit.formatted_text import FormattedText
+        
+        self._init_input_components()
         try:
             # 创建格式化的提示符
             formatted_prompt = FormattedText([
@@ -0,0 +1,47 @@
+"""
+规划缓存测试
+"""
+
+import sqlite3
+from array import array
+from contextlib import closing
+
+from intellicli.agent.plan_cache import PlanCache
+
+
+def _make_cache(tmp_path):
+    return PlanCache(db_path=str(tmp_path / "plan_cache.sqlite"), similarity_threshold=0.5)
+
+
+def test_near_miss_goal_does_not_reuse_destructive_plan(tmp_path):
+    cache = _make_cache(tmp_path)
+    cache.store("删除 b 目录", [
+        {"step": 1, "tool": "run_shell_command", "arguments": {"command": "rm -rf b"}},
+    ])
+
+    assert cache.lookup("删除 a.txt") is None
+    assert cache.lookup("删除 b 目录") is None
+
+
+def test_destructive_plan_from_older_cache_is_not_replayed(tmp_path):
+    cache = _make_cache(tmp_path)
+    # 模拟旧版本写入的含副作用模板
+    keyword = cache.extract_keyword("删除 b 目录")
+    with closing(sqlite3.connect(cache.db_path)) as conn, conn:
+        conn.execute(
+            "INSERT INTO plan_cache (keyword, template_json, embedding) VALUES (?, ?, ?)",
+            (keyword, '[{"arguments": {"command": "rm -rf b"}, "step": 1, "tool": "run_shell_command"}]',
+             array('f', cache._embed(keyword)).tobytes())
+        )
+
+    assert _make_cache(tmp_path).lookup("删除 b 目录") is None
+
+
+def test_read_only_plan_is_replayed_with_new_values(tmp_path):
+    cache = _make_cache(tmp_path)
+    cache.store("读取 notes.txt 的内容", [
+        {"step": 1, "tool": "read_file", "arguments": {"path": "notes.txt"}},
+    ])
+
+    plan = cache.lookup("读取 todo.txt 的内容")
+    assert plan == [{"step": 1, "tool": "read_file", "arguments": {"path": "todo.txt"}}]